@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CalculationRecord
+
+
+@admin.register(CalculationRecord)
+class CalculationRecordAdmin(admin.ModelAdmin):
+    list_display = ('mode', 'pressure', 'temperature', 'enthalpy', 'fast', 'created_at')
+    list_filter = ('mode', 'fast')
+    search_fields = ('key',)
+    readonly_fields = ('key', 'result', 'created_at')
@@ -1,6 +1,37 @@
+import gc
+import logging
+import time
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class CalculatorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calculator'
+
+    def ready(self):
+        from . import tablefile
+        tablefile.configure(getattr(settings, 'CALCULATOR_TABLES_FILE', None))
+        if getattr(settings, 'CALCULATOR_WARMUP', False):
+            self.warm_up()
+
+    def warm_up(self):
+        # Импорт iapws, таблицы и пробный расчёт в каждом режиме до первого запроса.
+        # При gunicorn --preload это делается в мастере до fork, и воркеры делят
+        # готовые таблицы копированием при записи.
+        started = time.perf_counter()
+        import iapws  # noqa: F401
+        from . import parallel
+        imported = time.perf_counter() - started
+        timings = parallel.warm_up(settings.CALCULATOR_FAST_MODE)
+        # Прогретые объекты — в постоянное поколение: сборщик мусора в воркерах
+        # не трогает их страницы и не копирует их
+        gc.freeze()
+        logger.info(
+            'Калькулятор прогрет за %.2f с (импорт %.2f с; %s)',
+            time.perf_counter() - started, imported,
+            ', '.join(f'{name} {seconds:.3f} с' for name, seconds in timings.items()),
+        )
@@ -0,0 +1,192 @@
+"""Замеры задержки расчёта по всем режимам calculator.engine.
+
+Для каждого режима формы (насыщение по P и T, P-H, P-T-water, P-T-steam)
+точки берутся в нескольких наборах: по всему допустимому диапазону, у
+критической точки и у границ областей IF97 (линия насыщения, граница B23,
+край таблицы насыщения). Каждая точка считается через compute_state мимо
+кэша, время — вместе с as_dict(), т. е. с ленивой вязкостью.
+
+Результат — словарь, пригодный для JSON: задержки p50/p95/p99 и среднее
+в микросекундах и пропускная способность в точках в секунду по каждому
+набору. compare() сравнивает два таких результата. scaling() меряет
+пропускную способность parallel.compute_many на 1, 2 и N воркерах.
+"""
+import math
+import os
+import platform
+import random
+import time
+
+import iapws
+from iapws.iapws97 import Ps_623, _Region1, _Region2, _t_P, _TSat_P
+
+from . import parallel
+from .engine import compute_state
+from .parallel import warm_up
+
+PMIN = 0.000612
+PC = 22.064
+TC = 373.946
+
+
+def _log_uniform(rng, low, high):
+    return math.exp(rng.uniform(math.log(low), math.log(high)))
+
+
+def _saturation_h(P):
+    # h' и h'' на линии насыщения (до 350 °C — области 1 и 2)
+    T = _TSat_P(P)
+    return _Region1(T, P)['h'], _Region2(T, P)['h']
+
+
+def _saturation_p(rng, sweep):
+    if sweep == 'range':
+        P = _log_uniform(rng, PMIN, PC - 0.001)
+    elif sweep == 'critical':
+        P = rng.uniform(21.5, PC - 0.001)
+    else:
+        # Край таблицы насыщения (350 °C): переход на точный расчёт
+        P = Ps_623 + rng.uniform(-0.05, 0.05)
+    return {'pressure': P}
+
+
+def _saturation_t(rng, sweep):
+    if sweep == 'range':
+        T = rng.uniform(0.01, TC - 0.001)
+    elif sweep == 'critical':
+        T = rng.uniform(370, TC - 0.001)
+    else:
+        T = 350 + rng.uniform(-0.5, 0.5)
+    return {'temperature': T}
+
+
+def _ph(rng, sweep):
+    if sweep == 'range':
+        return {'pressure': _log_uniform(rng, PMIN, 99.9), 'enthalpy': rng.uniform(10, 4000)}
+    if sweep == 'critical':
+        return {'pressure': rng.uniform(21, 24), 'enthalpy': rng.uniform(1800, 2400)}
+    if sweep == 'saturation':
+        P = _log_uniform(rng, 0.001, Ps_623)
+        h = rng.choice(_saturation_h(P))
+        return {'pressure': P, 'enthalpy': h + rng.uniform(-2, 2)}
+    # Граница B23 между областями 2 и 3
+    P = rng.uniform(Ps_623, 99.9)
+    h = _Region2(_t_P(P), P)['h']
+    return {'pressure': P, 'enthalpy': h + rng.uniform(-2, 2)}
+
+
+def _pt(rng, sweep):
+    if sweep == 'range':
+        return {'pressure': _log_uniform(rng, PMIN, 99.9), 'temperature': rng.uniform(0.01, 800)}
+    if sweep == 'critical':
+        return {'pressure': rng.uniform(21, 24), 'temperature': rng.uniform(370, 380)}
+    if sweep == 'saturation':
+        P = _log_uniform(rng, 0.001, Ps_623)
+        return {'pressure': P, 'temperature': _TSat_P(P) - 273.15 + rng.uniform(-0.5, 0.5)}
+    P = rng.uniform(Ps_623, 99.9)
+    return {'pressure': P, 'temperature': _t_P(P) - 273.15 + rng.uniform(-0.5, 0.5)}
+
+
+# Режим: (генератор точек, наборы)
+SWEEPS = {
+    'saturation-P': (_saturation_p, ('range', 'critical', 'table-edge')),
+    'saturation-T': (_saturation_t, ('range', 'critical', 'table-edge')),
+    'P-H': (_ph, ('range', 'critical', 'saturation', 'b23')),
+    'P-T-water': (_pt, ('range', 'critical', 'saturation', 'b23')),
+    'P-T-steam': (_pt, ('range', 'critical', 'saturation', 'b23')),
+}
+
+
+def points(mode, sweep, count, seed=0):
+    """Входные данные count точек набора sweep режима mode."""
+    generate = SWEEPS[mode][0]
+    rng = random.Random(f'{seed}:{mode}:{sweep}')
+    return [generate(rng, sweep) for _ in range(count)]
+
+
+def _percentile(ordered, q):
+    # Ближайший ранг: без интерполяции между замерами
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def measure(mode, inputs, fast=False, repeat=1):
+    timings = []
+    errors = 0
+    for _ in range(repeat):
+        for point in inputs:
+            start = time.perf_counter_ns()
+            try:
+                compute_state(mode, fast=fast, **point).as_dict()
+            except Exception:
+                errors += 1
+                continue
+            timings.append(time.perf_counter_ns() - start)
+    timings.sort()
+    result = {'points': len(inputs) * repeat, 'errors': errors}
+    if timings:
+        total = sum(timings)
+        result.update({
+            'p50_us': _percentile(timings, 50) / 1000,
+            'p95_us': _percentile(timings, 95) / 1000,
+            'p99_us': _percentile(timings, 99) / 1000,
+            'mean_us': total / len(timings) / 1000,
+            'throughput': len(timings) / total * 1e9,
+        })
+    return result
+
+
+def run(count=500, repeat=1, fast=False, seed=0, modes=None):
+    """Замеры по всем наборам; ключи cases — 'режим/набор'."""
+    warm_up(fast)
+    cases = {}
+    for mode in modes or SWEEPS:
+        for sweep in SWEEPS[mode][1]:
+            cases[f'{mode}/{sweep}'] = measure(mode, points(mode, sweep, count, seed), fast, repeat)
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'iapws': iapws.__version__,
+            'machine': platform.machine(),
+            'fast': fast,
+            'count': count,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'cases': cases,
+    }
+
+
+def scaling(count=5000, workers=None, fast=False, seed=0, chunk_size=None):
+    """Пропускная способность compute_many на пакете из всех режимов: {воркеров: замер}.
+
+    По умолчанию — 1, 2 и os.cpu_count() воркеров. Пулы прогреваются до замера.
+    """
+    batch = [
+        (mode, point) for mode in SWEEPS for point in points(mode, 'range', count // len(SWEEPS), seed)
+    ]
+    cpus = os.cpu_count() or 1
+    result = {}
+    for n in sorted(set(workers or (1, 2, cpus))):
+        parallel.compute_many(batch[:n * 4], fast, n, chunk_size=4)
+        started = time.perf_counter()
+        parallel.compute_many(batch, fast, n, chunk_size)
+        elapsed = time.perf_counter() - started
+        result[n] = {'seconds': elapsed, 'throughput': len(batch) / elapsed}
+    base = result[min(result)]['throughput']
+    for case in result.values():
+        case['speedup'] = case['throughput'] / base
+    return {'points': len(batch), 'cpus': cpus, 'workers': result}
+
+
+def compare(current, baseline, threshold=0.2, metrics=('p50_us', 'p95_us')):
+    """Наборы, где метрика выросла больше чем в 1 + threshold раз: [(набор, метрика, было, стало)]."""
+    slower = []
+    for name, case in current['cases'].items():
+        base = baseline['cases'].get(name)
+        if not base:
+            continue
+        for metric in metrics:
+            if metric in case and metric in base and case[metric] > base[metric] * (1 + threshold):
+                slower.append((name, metric, base[metric], case[metric]))
+    return slower
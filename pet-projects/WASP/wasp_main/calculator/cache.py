@@ -0,0 +1,260 @@
+"""Кэш рассчитанных состояний перед calculator.engine.
+
+Ключ — режим и нормализованные входные данные (10 значащих цифр, только
+поля, нужные режиму). Результат расчёта детерминирован, поэтому по умолчанию
+записи не устаревают (TTL = None) и удаляются только вытеснением.
+
+Бэкенды (settings.CALCULATOR_CACHE['BACKEND']):
+    'local'  — LRU в памяти процесса на MAXSIZE записей;
+    'django' — кэш Django с псевдонимом ALIAS, общий для воркеров gunicorn,
+               вытеснение и размер задаёт сам бэкенд кэша.
+
+SingleFlight объединяет одновременные промахи по одному ключу: считает
+первый запрос, остальные (из потоков или корутин) ждут его результат. Если
+ведущую корутину отменили (клиент ушёл), ожидающие не получают её отмену:
+один из них становится ведущим и считает заново.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .engine import compute_state
+
+DEFAULTS = {
+    'BACKEND': 'local',
+    'ALIAS': 'default',
+    'MAXSIZE': 1024,
+    'TTL': None,
+}
+
+# Входные поля, от которых зависит результат в каждом режиме
+MODE_INPUTS = {
+    'saturation-P': ('pressure',),
+    'saturation-T': ('temperature',),
+    'P-H': ('pressure', 'enthalpy'),
+    'P-T-water': ('pressure', 'temperature'),
+    'P-T-steam': ('pressure', 'temperature'),
+}
+
+
+def normalize(mode, fast=False, **inputs):
+    # Нормализованные входные данные и ключ кэша для них
+    normalized = {}
+    for name in MODE_INPUTS.get(mode, ()):
+        value = inputs.get(name)
+        normalized[name] = float(f'{value:.10g}') if value is not None else None
+    fast = bool(fast) and not mode.startswith('saturation')
+    key = (mode, fast) + tuple(normalized.values())
+    return key, normalized, fast
+
+
+def key_string(key):
+    # Строковая форма ключа: для кэша Django и истории расчётов в БД
+    return ':'.join(map(str, key))
+
+
+class StateCache:
+    def __init__(self, backend='local', alias='default', maxsize=1024, ttl=None):
+        if backend not in ('local', 'django'):
+            raise ValueError(f"Неизвестный бэкенд кэша: {backend}")
+        self.backend = backend
+        self.alias = alias
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULTS, **getattr(settings, 'CALCULATOR_CACHE', {})}
+        return cls(
+            backend=options['BACKEND'], alias=options['ALIAS'],
+            maxsize=options['MAXSIZE'], ttl=options['TTL'],
+        )
+
+    def get_or_compute(self, mode, fast=False, **inputs):
+        state = self.get(mode, fast, **inputs)
+        if state is None:
+            _, normalized, fast_mode = normalize(mode, fast, **inputs)
+            state = compute_state(mode, fast=fast_mode, **normalized)
+            self.put(state, mode, fast, **inputs)
+        return state
+
+    def get(self, mode, fast=False, **inputs):
+        # Состояние из кэша или None; учитывается в счётчиках попаданий
+        key = normalize(mode, fast, **inputs)[0]
+        state = self._get(key)
+        with self._lock:
+            if state is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return state
+
+    def put(self, state, mode, fast=False, **inputs):
+        self._set(normalize(mode, fast, **inputs)[0], state)
+
+    def _get(self, key):
+        if self.backend == 'django':
+            return caches[self.alias].get(self._django_key(key))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, state = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return state
+
+    def _set(self, key, state):
+        if self.backend == 'django':
+            caches[self.alias].set(self._django_key(key), state, timeout=self.ttl)
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _django_key(key):
+        return 'wasp:state:' + key_string(key)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            stats = {
+                'backend': self.backend,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+            if self.backend == 'local':
+                stats['size'] = len(self._entries)
+                stats['maxsize'] = self.maxsize
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+class _LeaderCancelled(Exception):
+    # Ведущий расчёт отменён — ожидающие повторяют его сами
+    pass
+
+
+class SingleFlight:
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self.saved_seconds = 0.0
+        # ключ -> [Future результата, число ожидающих]
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight[1] += 1
+                self.followers += 1
+                return flight[0], False
+            future = Future()
+            self._flights[key] = [future, 0]
+            return future, True
+
+    def _finish(self, key, started, saved=True):
+        # Ожидающие экономят по одному расчёту длительностью как у ведущего
+        duration = time.perf_counter() - started
+        with self._lock:
+            _, waiting = self._flights.pop(key)
+            self.leaders += 1
+            if saved:
+                self.saved_seconds += duration * waiting
+
+    def _fail(self, key, started, future, e):
+        # Отмена ведущего не передаётся ожидающим: они повторят расчёт
+        cancelled = isinstance(e, asyncio.CancelledError)
+        self._finish(key, started, saved=not cancelled)
+        future.set_exception(_LeaderCancelled() if cancelled else e)
+
+    def do(self, key, compute):
+        """Результат compute() для ключа и True, если он взят у уже идущего расчёта."""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result(), True
+            except _LeaderCancelled:
+                continue
+        started = time.perf_counter()
+        try:
+            result = compute()
+        except BaseException as e:
+            self._fail(key, started, future, e)
+            raise
+        self._finish(key, started)
+        future.set_result(result)
+        return result, False
+
+    async def ado(self, key, compute):
+        """Как do(), но compute — корутинная функция; ждать можно и расчёт из потока."""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return await asyncio.wrap_future(future), True
+            except _LeaderCancelled:
+                continue
+        started = time.perf_counter()
+        try:
+            result = await compute()
+        except BaseException as e:
+            self._fail(key, started, future, e)
+            raise
+        self._finish(key, started)
+        future.set_result(result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            total = self.leaders + self.followers
+            return {
+                'leaders': self.leaders,
+                'followers': self.followers,
+                'in_flight': len(self._flights),
+                'coalesced_rate': self.followers / total if total else 0.0,
+                'saved_seconds': self.saved_seconds,
+            }
+
+
+_state_cache = None
+_state_cache_lock = threading.Lock()
+_single_flight = SingleFlight()
+
+
+def get_state_cache():
+    global _state_cache
+    if _state_cache is None:
+        with _state_cache_lock:
+            if _state_cache is None:
+                _state_cache = StateCache.from_settings()
+    return _state_cache
+
+
+def get_single_flight():
+    return _single_flight
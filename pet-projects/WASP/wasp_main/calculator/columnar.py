@@ -0,0 +1,141 @@
+"""Столбцовый двоичный формат результатов: NPZ с выровненными массивами.
+
+Пакет, сетка или таблица по изобаре отдаётся одним архивом NPZ (ZIP без
+сжатия, по файлу .npy на столбец): каждое свойство — непрерывный массив
+float64 (NaN — нет значения), входные данные — столбцы pressure,
+temperature, enthalpy, плюс коды:
+    region — область IF97 (1…5; 0 — нет результата),
+    path   — индекс пути расчёта в path_labels (-1 — нет результата),
+    phase  — индекс фазы в phase_labels (-1 — нет результата),
+    error  — текст ошибки точки ('' — ошибки нет; только у пакетов и таблиц).
+
+Архив читается обычным np.load. Данные каждого столбца в файле выровнены
+по ALIGN байт, поэтому load() отдаёт массивы прямо поверх буфера или
+отображённого файла, без копирования и разбора:
+
+    with open('result.npz', 'rb') as f:
+        columns = columnar.load(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+Модуль не зависит от Django.
+"""
+import io
+import json
+import zipfile
+
+import numpy as np
+
+from .engine import PHASE_PROPERTIES, STATE_PROPERTIES, SaturationState
+
+MEDIA_TYPE = 'application/x-npz'
+ALIGN = 64
+PATHS = ('saturation-table', 'sbtl', 'equation', 'iteration', 'iapws97', 'extrapolation')
+# Фаза по степени сухости; 'saturation' — результат режима насыщения (столбцы *_water, *_steam)
+PHASES = ('water', 'steam', 'wet', 'saturation')
+# Поле extra локального заголовка ZIP для выравнивания (как у zipalign)
+_PADDING_ID = 0xD935
+
+
+def _codes(states):
+    region = np.zeros(len(states), dtype=np.int8)
+    path = np.full(len(states), -1, dtype=np.int8)
+    phase = np.full(len(states), -1, dtype=np.int8)
+    for i, state in enumerate(states):
+        if state is None:
+            continue
+        region[i] = int(state.region[0])
+        path[i] = PATHS.index(state.path)
+        if isinstance(state, SaturationState):
+            phase[i] = 3
+        else:
+            phase[i] = 0 if state.x == 0 else 1 if state.x == 1 else 2
+    return {'region': region, 'path': path, 'phase': phase}
+
+
+def _column(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def from_results(results, properties=None, inputs=None):
+    """Столбцы для списка (состояние, None) или (None, ошибка); inputs — столбцы входных данных."""
+    states = [state for state, _ in results]
+    names = [name for name in STATE_PROPERTIES if properties is None or name in properties]
+    columns = dict(inputs or {})
+    saturated = any(isinstance(state, SaturationState) for state in states)
+    for name in names:
+        # У состояния насыщения из STATE_PROPERTIES есть только P и T
+        columns[name] = _column(
+            getattr(state, name) if state is not None and (name in ('P', 'T') or not isinstance(state, SaturationState))
+            else None
+            for state in states
+        )
+    if saturated:
+        for name in PHASE_PROPERTIES:
+            if properties is not None and name not in properties:
+                continue
+            for phase in ('water', 'steam'):
+                columns[f'{name}_{phase}'] = _column(
+                    getattr(getattr(state, phase), name) if isinstance(state, SaturationState) else None
+                    for state in states
+                )
+    columns.update(_codes(states))
+    columns['error'] = np.array([
+        '' if error is None else error if isinstance(error, str) else json.dumps(error, ensure_ascii=False)
+        for _, error in results
+    ])
+    return columns
+
+
+def from_grid(columns, inputs):
+    """Столбцы сетки calculator.vectorized (массивы формы сетки) с кодами фаз."""
+    arrays = dict(inputs)
+    for name, values in columns.items():
+        arrays[name] = values.astype(np.int8) if name == 'region' else np.ascontiguousarray(values, np.float64)
+    x, region = columns['x'], columns['region']
+    phase = np.where(x == 0, 0, np.where(x == 1, 1, 2)).astype(np.int8)
+    arrays['phase'] = np.where(region == 0, -1, phase).astype(np.int8)
+    return arrays
+
+
+def dumps(columns):
+    """Архив NPZ со столбцами columns и таблицами подписей path_labels, phase_labels."""
+    arrays = {**columns, 'path_labels': np.array(PATHS), 'phase_labels': np.array(PHASES)}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for name, array in arrays.items():
+            data = io.BytesIO()
+            np.lib.format.write_array(data, np.ascontiguousarray(array), allow_pickle=False)
+            info = zipfile.ZipInfo(f'{name}.npy', date_time=(1980, 1, 1, 0, 0, 0))
+            # Заголовок .npy кратен 64 байтам: выравнивается начало записи после локального заголовка
+            start = buffer.tell() + 30 + len(info.filename.encode()) + 4
+            padding = -start % ALIGN
+            info.extra = _PADDING_ID.to_bytes(2, 'little') + padding.to_bytes(2, 'little') + bytes(padding)
+            archive.writestr(info, data.getvalue())
+    return buffer.getvalue()
+
+
+def load(buffer):
+    """Столбцы архива dumps() как массивы поверх buffer (bytes, mmap) без копирования."""
+    view = memoryview(buffer)
+    # mmap сам файлоподобен; BytesIO над bytes данные не копирует
+    source = buffer if hasattr(buffer, 'seek') else io.BytesIO(buffer)
+    arrays = {}
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename}: столбец сжат, чтение без копирования невозможно")
+            offset = info.header_offset
+            local = view[offset:offset + 30]
+            offset += 30 + int.from_bytes(local[26:28], 'little') + int.from_bytes(local[28:30], 'little')
+            # Заголовок .npy: магия, версия, длина словаря (2 байта в версии 1, 4 — в 2)
+            version = (view[offset + 6], view[offset + 7])
+            size = 2 if version == (1, 0) else 4
+            length = int.from_bytes(view[offset + 8:offset + 8 + size], 'little')
+            header = io.BytesIO(view[offset:offset + 8 + size + length])
+            np.lib.format.read_magic(header)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+            array = np.frombuffer(view, dtype=dtype, count=int(np.prod(shape)), offset=offset + header.tell())
+            arrays[info.filename.removesuffix('.npy')] = array.reshape(shape, order='F' if fortran_order else 'C')
+    return arrays
@@ -0,0 +1,187 @@
+"""Цикл Ренкина (с промежуточным перегревом или без) на движке calculator.engine.
+
+Точки цикла:
+    1  — вход насоса: вода на линии насыщения при давлении конденсатора;
+    2s — выход насоса при изоэнтропном сжатии, 2 — с учётом КПД насоса;
+    3  — вход турбины: давление котла и температура острого пара;
+    4s — выход турбины (ЦВД при перегреве) при изоэнтропном расширении, 4 — с учётом КПД;
+    5  — после промежуточного перегрева: давление и температура перегрева;
+    6s, 6 — выход ЦНД при изоэнтропном и реальном расширении до давления конденсатора.
+
+Все точки считаются за один вызов solve(). Изоэнтропные точки — обращением
+P-s (engine.compute_ps). Состояния насыщения при давлениях конденсатора и
+перегрева считаются один раз: из них берутся точка 1 и все точки выхода
+турбины, попавшие во влажный пар, — без выбора области и итераций.
+
+Удельные величины — на 1 кг рабочего тела, кДж/кг; тепловой расход
+(heat_rate) — кДж подведённой теплоты на 1 кВт·ч полезной работы, удельный
+расход пара (steam_rate) — кг/(кВт·ч). С расходом mass_flow [кг/с]
+добавляются мощности в кВт.
+"""
+from dataclasses import dataclass
+
+from .engine import State, compute_ps, compute_state
+
+# Подписи точек цикла
+POINTS = {
+    '1': 'Вход насоса',
+    '2s': 'Выход насоса (изоэнтропный)',
+    '2': 'Выход насоса',
+    '3': 'Вход турбины',
+    '4s': 'Выход турбины (изоэнтропный)',
+    '4': 'Выход турбины',
+    '5': 'После промежуточного перегрева',
+    '6s': 'Выход ЦНД (изоэнтропный)',
+    '6': 'Выход ЦНД',
+}
+
+
+@dataclass(slots=True)
+class CyclePoint:
+    name: str
+    label: str
+    state: State
+
+    def as_dict(self, properties=None):
+        return {'name': self.name, 'label': self.label, 'state': self.state.as_dict(properties)}
+
+
+@dataclass(slots=True)
+class Cycle:
+    points: list
+    pump_work: float
+    turbine_work: float
+    heat_in: float
+    heat_out: float
+    net_work: float
+    efficiency: float
+    heat_rate: float
+    steam_rate: float
+    back_work_ratio: float
+    mass_flow: float = None
+
+    @property
+    def power(self):
+        # Мощности, кВт: турбина, насос, полезная, подведённая теплота
+        if self.mass_flow is None:
+            return None
+        return {
+            'turbine': self.turbine_work * self.mass_flow,
+            'pump': self.pump_work * self.mass_flow,
+            'net': self.net_work * self.mass_flow,
+            'heat_in': self.heat_in * self.mass_flow,
+        }
+
+    def as_dict(self, properties=None):
+        return {
+            'points': [point.as_dict(properties) for point in self.points],
+            'pump_work': self.pump_work,
+            'turbine_work': self.turbine_work,
+            'heat_in': self.heat_in,
+            'heat_out': self.heat_out,
+            'net_work': self.net_work,
+            'efficiency': self.efficiency,
+            'heat_rate': self.heat_rate,
+            'steam_rate': self.steam_rate,
+            'back_work_ratio': self.back_work_ratio,
+            'mass_flow': self.mass_flow,
+            'power': self.power,
+        }
+
+
+class _Solver:
+    def __init__(self):
+        # Насыщение по давлению — одно на все точки цикла при этом давлении
+        self._saturation = {}
+
+    def saturation(self, P):
+        if P not in self._saturation:
+            self._saturation[P] = compute_state('saturation-P', pressure=P) if P < 22.064 else None
+        return self._saturation[P]
+
+    def _wet(self, P, name, value):
+        # Влажный пар по таблице насыщения: смешение фаз по h или s, иначе None
+        sat = self.saturation(P)
+        if sat is None:
+            return None
+        low, high = getattr(sat.water, name), getattr(sat.steam, name)
+        if not low < value < high:
+            return None
+        x = (value - low) / (high - low)
+        v = sat.water.v + x * (sat.steam.v - sat.water.v)
+        h = sat.water.h + x * (sat.steam.h - sat.water.h) if name == 's' else value
+        s = sat.water.s + x * (sat.steam.s - sat.water.s) if name == 'h' else value
+        return State(P, sat.T, h, s, v, 1 / v, x, region='4', path=sat.path)
+
+    def ps(self, P, s):
+        return self._wet(P, 's', s) or compute_ps(P, s)
+
+    def ph(self, P, h):
+        return self._wet(P, 'h', h) or compute_state('P-H', pressure=P, enthalpy=h)
+
+    def expand(self, inlet, P, efficiency):
+        # Расширение в турбине до P: изоэнтропная точка и реальная по КПД
+        ideal = self.ps(P, inlet.s)
+        return ideal, self.ph(P, inlet.h - efficiency * (inlet.h - ideal.h))
+
+
+def _check(boiler_pressure, condenser_pressure, turbine_efficiency, pump_efficiency,
+           reheat_pressure, reheat_temperature, mass_flow):
+    if not 0.000611 < condenser_pressure < boiler_pressure < 100:
+        raise ValueError("Нужно 0.000611 МПа < давление конденсатора < давление котла < 100 МПа")
+    for name, value in (('турбины', turbine_efficiency), ('насоса', pump_efficiency)):
+        if not 0 < value <= 1:
+            raise ValueError(f"КПД {name} должен быть в диапазоне (0, 1]")
+    if (reheat_pressure is None) != (reheat_temperature is None):
+        raise ValueError("Для промежуточного перегрева нужны и давление, и температура")
+    if reheat_pressure is not None and not condenser_pressure < reheat_pressure < boiler_pressure:
+        raise ValueError("Давление перегрева должно быть между давлениями конденсатора и котла")
+    if mass_flow is not None and mass_flow <= 0:
+        raise ValueError("Расход должен быть больше 0")
+
+
+def solve(boiler_pressure, turbine_temperature, condenser_pressure, turbine_efficiency=1.0,
+          pump_efficiency=1.0, reheat_pressure=None, reheat_temperature=None, mass_flow=None):
+    """Цикл Ренкина: давления в МПа, температуры в °C, КПД — доли единицы, расход — кг/с."""
+    _check(boiler_pressure, condenser_pressure, turbine_efficiency, pump_efficiency,
+           reheat_pressure, reheat_temperature, mass_flow)
+    solver = _Solver()
+    condenser = solver.saturation(condenser_pressure)
+    water = condenser.water
+    states = {'1': State(condenser_pressure, condenser.T, water.h, water.s, water.v, water.rho, 0,
+                         viscosity=water.mu, region='1', path=condenser.path)}
+    states['2s'] = solver.ps(boiler_pressure, water.s)
+    states['2'] = solver.ph(boiler_pressure, water.h + (states['2s'].h - water.h) / pump_efficiency)
+    states['3'] = compute_state('P-T-steam', pressure=boiler_pressure, temperature=turbine_temperature)
+    if states['3'].x < 1:
+        raise ValueError("На входе турбины не перегретый пар: повысьте температуру")
+    if reheat_pressure is None:
+        states['4s'], states['4'] = solver.expand(states['3'], condenser_pressure, turbine_efficiency)
+        turbine_work = states['3'].h - states['4'].h
+        outlet, reheat = states['4'], 0.0
+    else:
+        states['4s'], states['4'] = solver.expand(states['3'], reheat_pressure, turbine_efficiency)
+        states['5'] = compute_state('P-T-steam', pressure=reheat_pressure, temperature=reheat_temperature)
+        if states['5'].h <= states['4'].h:
+            raise ValueError("Температура перегрева ниже температуры пара на выходе ЦВД")
+        states['6s'], states['6'] = solver.expand(states['5'], condenser_pressure, turbine_efficiency)
+        turbine_work = states['3'].h - states['4'].h + states['5'].h - states['6'].h
+        outlet, reheat = states['6'], states['5'].h - states['4'].h
+
+    pump_work = states['2'].h - water.h
+    heat_in = states['3'].h - states['2'].h + reheat
+    net_work = turbine_work - pump_work
+    efficiency = net_work / heat_in
+    return Cycle(
+        points=[CyclePoint(name, POINTS[name], state) for name, state in states.items()],
+        pump_work=pump_work,
+        turbine_work=turbine_work,
+        heat_in=heat_in,
+        heat_out=outlet.h - water.h,
+        net_work=net_work,
+        efficiency=efficiency,
+        heat_rate=3600 / efficiency,
+        steam_rate=3600 / net_work,
+        back_work_ratio=pump_work / turbine_work,
+        mass_flow=mass_flow,
+    )
@@ -0,0 +1,435 @@
+"""Расчёт свойств воды и водяного пара по IAPWS-IF97.
+
+Модуль не зависит от Django: его используют представления, API и
+офлайн-скрипты. Единственная точка входа — compute_state(mode, **inputs).
+
+Состояние по паре (P, T) или (P, h) считается уравнением своей области IF97
+без полного заполнения IAPWS97 (производные, теплопроводность, диэлектрическая
+проницаемость и т. п.). Вязкость mu и nu считаются при первом обращении,
+поэтому шаблон или ответ API, не читающие их, за них не платят.
+
+Расширенные свойства (EXTENDED_PROPERTIES: теплоёмкости, скорость звука,
+теплопроводность, число Прандтля, сжимаемости и производные) считаются
+при первом обращении к любому из них, все сразу, по производным cp, cv, w,
+alfav, kt уравнения области из того же расчёта — без повторного решения.
+Имена и формулы — как у атрибутов IAPWS97, но kappas, joule и deltat
+переведены в 1/МПа, К/МПа и кДж/(кг·МПа): IAPWS97 (iapws 1.5) смешивает в
+них кДж и МПа и даёт значения в 1000 раз меньше. В двухфазной области
+расширенные свойства не определены (None).
+
+Область IF97 выбирается индексом границ calculator.regions. Каждое состояние
+несёт область (region: '1'…'5', '3a'/'3b' для P-H) и путь расчёта (path):
+    'saturation-table' — таблица линии насыщения;
+    'sbtl'             — сплайновые таблицы быстрого режима;
+    'equation'         — прямой расчёт по уравнению области;
+    'iteration'        — итерации по уравнению области (P-H, область 3 по P-T);
+    'iapws97'          — полный IAPWS97 (насыщение выше 350 °C).
+"""
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+from iapws import IAPWS97
+from iapws._iapws import Pc, Tc, _ThCond, _Viscosity, rhoc
+from iapws.iapws97 import (
+    _Backward1_T_Ph, _Backward1_T_Ps, _Backward2_T_Ph, _Backward2_T_Ps, _Backward3_T_Ph,
+    _Backward3_T_Ps, _Backward3_v_Ph, _Backward3_v_Ps, _Backward3_v_PT, _Bound_Ps,
+    _Region1, _Region2, _Region3, _Region4, _Region5, _TSat_P,
+)
+from scipy.optimize import fsolve, newton
+
+from . import regions, saturation, sbtl
+
+# Режимы расчёта: линия насыщения по P или T и пары параметров для всей области
+MODES = ('saturation-P', 'saturation-T', 'P-H', 'P-T-water', 'P-T-steam')
+
+
+# Свойства в ответах: properties в as_dict() выбирает подмножество этих имён
+EXTENDED_PROPERTIES = (
+    'cp', 'cv', 'cp_cv', 'gamma', 'w', 'k', 'Prandt', 'alfav', 'xkappa', 'kappas', 'joule', 'deltat',
+)
+PHASE_PROPERTIES = ('h', 's', 'v', 'rho', 'mu', 'nu') + EXTENDED_PROPERTIES
+STATE_PROPERTIES = ('P', 'T', 'h', 's', 'v', 'rho', 'x', 'mu', 'nu') + EXTENDED_PROPERTIES
+
+
+def _extended_property(name):
+    return property(lambda self: self.extended()[name])
+
+
+class _Extended:
+    # Расширенные свойства фазы или состояния; наследнику нужны поля T [°C или К — см.
+    # _kelvin()], P, rho, mu, derivatives, extended_values и метод _derivatives()
+    __slots__ = ()
+
+    def extended(self):
+        if self.extended_values is None:
+            self.extended_values = _extended(self._kelvin(), self.P, self.rho, self.mu, self._derivatives())
+        return self.extended_values
+
+    cp = _extended_property('cp')
+    cv = _extended_property('cv')
+    cp_cv = _extended_property('cp_cv')
+    gamma = _extended_property('gamma')
+    w = _extended_property('w')
+    k = _extended_property('k')
+    Prandt = _extended_property('Prandt')
+    alfav = _extended_property('alfav')
+    xkappa = _extended_property('xkappa')
+    kappas = _extended_property('kappas')
+    joule = _extended_property('joule')
+    deltat = _extended_property('deltat')
+
+
+@dataclass(slots=True)
+class Phase(_Extended):
+    h: float
+    s: float
+    v: float
+    rho: float
+    mu: float
+    nu: float
+    # Температура насыщения [К] и давление [МПа] — для расширенных свойств
+    T: float = field(default=None, repr=False, compare=False)
+    P: float = field(default=None, repr=False, compare=False)
+    steam: bool = field(default=False, repr=False, compare=False)
+    derivatives: dict = field(default=None, repr=False, compare=False)
+    extended_values: dict = field(default=None, repr=False, compare=False)
+
+    def _kelvin(self):
+        return self.T
+
+    def _derivatives(self):
+        # До 350 °C фазы насыщения — области 1 и 2, выше — уравнение области 3 по плотности
+        if self.derivatives is None:
+            if self.T > 623.15:
+                self.derivatives = _Region3(self.rho, self.T)
+            else:
+                self.derivatives = (_Region2 if self.steam else _Region1)(self.T, self.P)
+        return self.derivatives
+
+    def as_dict(self, properties=None):
+        return {name: getattr(self, name) for name in _selected(PHASE_PROPERTIES, properties)}
+
+
+@dataclass(slots=True)
+class SaturationState:
+    P: float
+    T: float
+    water: Phase
+    steam: Phase
+    path: str = 'saturation-table'
+    region: str = '4'
+
+    def as_dict(self, properties=None):
+        data = {name: getattr(self, name) for name in _selected(('P', 'T'), properties)}
+        data['water'] = self.water.as_dict(properties)
+        data['steam'] = self.steam.as_dict(properties)
+        data['region'] = self.region
+        data['path'] = self.path
+        return data
+
+
+@dataclass(slots=True)
+class State(_Extended):
+    P: float
+    T: float
+    h: float
+    s: float
+    v: float
+    rho: float
+    x: float
+    # Вязкость, если уже известна (таблицы); иначе считается при первом обращении к mu
+    viscosity: float = field(default=None, repr=False, compare=False)
+    region: str = None
+    path: str = None
+    # Свойства уравнения области из расчёта (cp, cv, w, alfav, kt); без них — по T, P
+    derivatives: dict = field(default=None, repr=False, compare=False)
+    extended_values: dict = field(default=None, repr=False, compare=False)
+
+    @property
+    def mu(self):
+        # В двухфазной области IAPWS97 не определяет вязкость смеси
+        if 0 < self.x < 1:
+            return None
+        if self.viscosity is None:
+            self.viscosity = _Viscosity(self.rho, self.T + 273.15)
+        return self.viscosity
+
+    @property
+    def nu(self):
+        mu = self.mu
+        return mu / self.rho if mu is not None else None
+
+    def _kelvin(self):
+        return self.T + 273.15
+
+    def _derivatives(self):
+        # Таблицы (быстрый режим, история) производных не дают — уравнение области по T, P
+        if self.derivatives is None and not 0 < self.x < 1 and self.region != '4':
+            T = self.T + 273.15
+            if self.region.startswith('3'):
+                self.derivatives = _Region3(self.rho, T)
+            else:
+                self.derivatives = {'1': _Region1, '2': _Region2, '5': _Region5}[self.region](T, self.P)
+        return self.derivatives
+
+    def as_dict(self, properties=None):
+        data = {name: getattr(self, name) for name in _selected(STATE_PROPERTIES, properties)}
+        data['region'] = self.region
+        data['path'] = self.path
+        return data
+
+
+def _extended(T, P, rho, mu, derivatives):
+    # Формулы производных — как deriv_G в IAPWS97.fill, с множителем 1000 там,
+    # где cp в кДж/(кг·К) встречается с давлением в МПа; T в К
+    if mu is None or not derivatives or derivatives.get('cp') is None:
+        return dict.fromkeys(EXTENDED_PROPERTIES)
+    cp, cv, w = derivatives['cp'], derivatives['cv'], derivatives['w']
+    alfav, kt = derivatives['alfav'], derivatives['kt']
+    v = 1 / rho
+    cp_cv = cp / cv
+    # Критическое усиление теплопроводности — по промышленной формулировке, как в IAPWS97
+    k = _ThCond(rho, T, SimpleNamespace(drhodP_T=rho * kt, cp_cv=cp_cv, cp=cp, mu=mu))
+    return {
+        'cp': cp,
+        'cv': cv,
+        'cp_cv': cp_cv,
+        'gamma': cp_cv / P / kt,
+        'w': w,
+        'k': k,
+        'Prandt': mu * cp * 1000 / k,
+        'alfav': alfav,
+        'xkappa': kt,
+        'kappas': kt - 1000 * v * alfav ** 2 * T / cp,
+        'joule': 1000 * v * (T * alfav - 1) / cp,
+        'deltat': 1000 * v * (1 - T * alfav),
+    }
+
+
+def base_dict(state):
+    """Основные поля состояния для хранения: ленивые mu и расширенные свойства не считаются.
+
+    state_from_dict() восстанавливает по ним состояние, остальное досчитается
+    при обращении. У фаз насыщения вязкость из таблицы — тоже поле.
+    """
+    if isinstance(state, SaturationState):
+        return state.as_dict(('P', 'T') + PHASE_PROPERTIES[:6])
+    data = {name: getattr(state, name) for name in ('P', 'T', 'h', 's', 'v', 'x')}
+    # Уже известная вязкость (таблицы, прочитанное свойство) сохраняется, но не считается
+    if state.viscosity is not None:
+        data['mu'] = state.viscosity
+    data['region'] = state.region
+    data['path'] = state.path
+    return data
+
+
+def state_from_dict(data):
+    """Состояние по результату as_dict() или base_dict() (например, из истории расчётов)."""
+    if 'water' in data:
+        T = data['T'] + 273.15
+        return SaturationState(
+            data['P'], data['T'],
+            Phase(**_restored(data['water'], PHASE_PROPERTIES[:6]), T=T, P=data['P']),
+            Phase(**_restored(data['steam'], PHASE_PROPERTIES[:6]), T=T, P=data['P'], steam=True),
+            data['path'], data['region'],
+        )
+    values = _restored(data, ('P', 'T', 'h', 's', 'v', 'x'))
+    rho = data['rho'] if 'rho' in data else 1 / data['v']
+    return State(**values, rho=rho, viscosity=data.get('mu'), region=data['region'], path=data['path'])
+
+
+def _restored(data, names):
+    # Записи без расширенных свойств (до их появления) досчитают их при обращении
+    values = {name: data[name] for name in names}
+    if all(name in data for name in EXTENDED_PROPERTIES):
+        values['extended_values'] = {name: data[name] for name in EXTENDED_PROPERTIES}
+    return values
+
+
+def _selected(names, properties):
+    # Порядок — как в names; неизвестные имена пропускаются
+    if properties is None:
+        return names
+    return [name for name in names if name in properties]
+
+
+def mode_of(data):
+    # Режим движка по очищенным данным WaterPropertiesForm
+    if data['mode'] == 'saturation':
+        return 'saturation-' + data['calc_by']
+    return data['param_type']
+
+
+def compute_state(mode, pressure=None, temperature=None, enthalpy=None, fast=False):
+    # fast=True — расчёт всей области по сплайновым таблицам (см. calculator.sbtl)
+    # с переходом на точный IAPWS97 у границ областей и критической точки
+    if mode == 'saturation-P':
+        if not (0.000611 < pressure < 22.064):
+            raise ValueError("Давление должно быть в диапазоне 0.000611–22.064 МПа")
+        # Давление — введённое, температура — по уравнению насыщения
+        sat = saturation.lookup_P(pressure)
+        if sat is not None:
+            T, water, steam = sat
+            return SaturationState(
+                pressure, T - 273.15, _table_phase(water, T, pressure), _table_phase(steam, T, pressure, True),
+            )
+        water = IAPWS97(P=pressure, x=0)
+        steam = IAPWS97(P=pressure, x=1)
+        return SaturationState(pressure, water.T - 273.15, _phase(water), _phase(steam), 'iapws97')
+    if mode == 'saturation-T':
+        if not (0 < temperature < 373.946):
+            raise ValueError("Температура должна быть в диапазоне 0–373.946 °C")
+        sat = saturation.lookup_T(temperature + 273.15)
+        if sat is not None:
+            P, water, steam = sat
+            T = temperature + 273.15
+            return SaturationState(P, temperature, _table_phase(water, T, P), _table_phase(steam, T, P, True))
+        water = IAPWS97(T=temperature + 273.15, x=0)
+        steam = IAPWS97(T=temperature + 273.15, x=1)
+        return SaturationState(water.P, temperature, _phase(water), _phase(steam), 'iapws97')
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный режим расчёта: {mode}")
+
+    if not (0.000611 < pressure < 100):
+        raise ValueError("Давление должно быть в диапазоне 0.000611–100 МПа")
+    if fast:
+        if mode == 'P-H':
+            props = sbtl.lookup_ph(pressure, enthalpy)
+        else:
+            props = sbtl.lookup_pt(pressure, temperature + 273.15)
+        if props is not None:
+            T, h, s, v, x, mu = props
+            region = '1' if x == 0 else '2' if x == 1 else '4'
+            return State(pressure, T - 273.15, h, s, v, 1 / v, x, mu, region, 'sbtl')
+    # P-T-water и P-T-steam дают одно и то же: при заданных P и T IAPWS97 не смотрит на x
+    if mode == 'P-H':
+        # Внутри купола — смешение фаз по таблице насыщения без выбора области и итераций
+        wet = saturation.lookup_wet(pressure, enthalpy)
+        if wet is not None:
+            T, x, s, v = wet
+            return State(pressure, T - 273.15, enthalpy, s, v, 1 / v, x,
+                         region='4', path='saturation-table')
+        props = _region_ph(pressure, enthalpy)
+    else:
+        props = _region_pt(pressure, temperature + 273.15)
+    return region_state(mode, props)
+
+
+def compute_ps(pressure, entropy):
+    """Состояние по давлению P [МПа] и энтропии s [кДж/(кг·К)], как IAPWS97(P=, s=)."""
+    if not (0.000611 < pressure < 100):
+        raise ValueError("Давление должно быть в диапазоне 0.000611–100 МПа")
+    return region_state('P-S', _region_ps(pressure, entropy))
+
+
+def region_state(mode, props):
+    """Состояние по словарю свойств уравнения области IF97 с областью и путём расчёта."""
+    region = props['region']
+    if mode == 'P-H':
+        path = 'equation' if region == 4 else 'iteration'
+        label = regions.label(region, props['P'], props['h'])
+    elif mode == 'P-S':
+        path = 'equation' if region == 4 else 'iteration'
+        label = regions.label(region, props['P'])
+    else:
+        path = 'iteration' if region == 3 else 'equation'
+        label = regions.label(region, props['P'], props['h'])
+    return State(
+        props['P'], props['T'] - 273.15, props['h'], props['s'], props['v'],
+        1 / props['v'], props['x'], region=label, path=path, derivatives=props,
+    )
+
+
+def _region_pt(P, T):
+    # Итерации — как в IAPWS97.calculo для пары TP
+    region = regions.classify_pt(P, T)
+    if region == 1:
+        return _Region1(T, P)
+    if region == 2:
+        return _Region2(T, P)
+    if region == 3:
+        if T == Tc and P == Pc:
+            rho = rhoc
+        else:
+            rho = newton(lambda rho: _Region3(rho, T)['P'] - P, 1 / _Backward3_v_PT(P, T))
+        return _Region3(rho, T)
+    if region == 5:
+        return _Region5(T, P)
+    raise NotImplementedError("Incoming out of bound")
+
+
+def _region_ph(P, h):
+    # Итерации — как в IAPWS97.calculo для пары Ph, область — по индексу границ
+    region = regions.classify_ph(P, h)
+    if region == 1:
+        T = newton(lambda T: _Region1(T, P)['h'] - h, _Backward1_T_Ph(P, h))
+        return _Region1(T, P)
+    if region == 2:
+        T = newton(lambda T: _Region2(T, P)['h'] - h, _Backward2_T_Ph(P, h))
+        return _Region2(T, P)
+    if region == 3:
+        def residual(par):
+            return _Region3(par[0], par[1])['h'] - h, _Region3(par[0], par[1])['P'] - P
+
+        rho, T = fsolve(residual, [1 / _Backward3_v_Ph(P, h), _Backward3_T_Ph(P, h)])
+        return _Region3(rho, T)
+    if region == 4:
+        T = _TSat_P(P)
+        if T <= 623.15:
+            h1, h2 = _Region1(T, P)['h'], _Region2(T, P)['h']
+        else:
+            h1, h2 = _Region4(P, 0)['h'], _Region4(P, 1)['h']
+        return _Region4(P, (h - h1) / (h2 - h1))
+    if region == 5:
+        T = newton(lambda T: _Region5(T, P)['h'] - h, 1500)
+        return _Region5(T, P)
+    raise NotImplementedError("Incoming out of bound")
+
+
+def _region_ps(P, s):
+    # Итерации — как в IAPWS97.calculo для пары Ps
+    region = _Bound_Ps(P, s)
+    if region == 1:
+        T = newton(lambda T: _Region1(T, P)['s'] - s, _Backward1_T_Ps(P, s))
+        return _Region1(T, P)
+    if region == 2:
+        T = newton(lambda T: _Region2(T, P)['s'] - s, _Backward2_T_Ps(P, s))
+        return _Region2(T, P)
+    if region == 3:
+        def residual(par):
+            return _Region3(par[0], par[1])['s'] - s, _Region3(par[0], par[1])['P'] - P
+
+        rho, T = fsolve(residual, [1 / _Backward3_v_Ps(P, s), _Backward3_T_Ps(P, s)])
+        return _Region3(rho, T)
+    if region == 4:
+        T = _TSat_P(P)
+        if T <= 623.15:
+            s1, s2 = _Region1(T, P)['s'], _Region2(T, P)['s']
+        else:
+            s1, s2 = _Region4(P, 0)['s'], _Region4(P, 1)['s']
+        return _Region4(P, (s - s1) / (s2 - s1))
+    if region == 5:
+        T = newton(lambda T: _Region5(T, P)['s'] - s, 1500)
+        return _Region5(T, P)
+    raise NotImplementedError("Incoming out of bound")
+
+
+def _phase(state):
+    derivatives = {'cp': state.cp, 'cv': state.cv, 'w': state.w, 'alfav': state.alfav, 'kt': state.xkappa}
+    return Phase(
+        state.h, state.s, state.v, state.rho, state.mu, _nu(state), state.T, state.P,
+        derivatives=derivatives,
+    )
+
+
+def _table_phase(props, T, P, steam=False):
+    # Фаза из таблицы насыщения: (h, s, v, mu); T — в К
+    h, s, v, mu = props
+    return Phase(h, s, v, 1 / v, mu, mu * v, T, P, steam)
+
+
+def _nu(state):
+    # В двухфазной области IAPWS97 не определяет вязкость смеси
+    if state.mu is None:
+        return None
+    return state.mu / state.rho
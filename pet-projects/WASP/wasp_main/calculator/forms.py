@@ -54,3 +54,41 @@ class WaterPropertiesForm(forms.Form):
                     raise forms.ValidationError("Давление должно быть больше 0.")
 
         return cleaned_data
+
+
+class RankineCycleForm(forms.Form):
+    boiler_pressure = forms.FloatField(label="Давление в котле (МПа)", min_value=0.0)
+    turbine_temperature = forms.FloatField(label="Температура перед турбиной (°C)")
+    condenser_pressure = forms.FloatField(label="Давление в конденсаторе (МПа)", min_value=0.0)
+    turbine_efficiency = forms.FloatField(label="Внутренний КПД турбины", min_value=0.0, max_value=1.0)
+    pump_efficiency = forms.FloatField(label="КПД насоса", min_value=0.0, max_value=1.0)
+    reheat_pressure = forms.FloatField(required=False, label="Давление промежуточного перегрева (МПа)",
+                                       min_value=0.0)
+    reheat_temperature = forms.FloatField(required=False, label="Температура промежуточного перегрева (°C)")
+    mass_flow = forms.FloatField(required=False, label="Расход пара (кг/с)", min_value=0.0)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if (cleaned_data.get('reheat_pressure') is None) != (cleaned_data.get('reheat_temperature') is None):
+            raise forms.ValidationError("Для промежуточного перегрева введите и давление, и температуру.")
+        return cleaned_data
+
+
+class PipeFlowForm(forms.Form):
+    pressure = forms.FloatField(label="Давление на входе (МПа)", min_value=0.0)
+    temperature = forms.FloatField(required=False, label="Температура на входе (°C)")
+    enthalpy = forms.FloatField(required=False, label="Энтальпия на входе (кДж/кг)")
+    mass_flow = forms.FloatField(label="Расход (кг/с)", min_value=0.0)
+    length = forms.FloatField(label="Длина трубы (м)", min_value=0.0)
+    diameter = forms.FloatField(label="Внутренний диаметр (мм)", min_value=0.0)
+    roughness = forms.FloatField(required=False, label="Шероховатость стенки (мм)", min_value=0.0)
+    heat_flux = forms.FloatField(required=False, label="Тепловой поток на стенке (кВт/м²)")
+    elevation = forms.FloatField(required=False, label="Перепад высот выход − вход (м)")
+    segments = forms.IntegerField(required=False, label="Число участков", min_value=1, max_value=10000)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if (cleaned_data.get('temperature') is None) == (cleaned_data.get('enthalpy') is None):
+            raise forms.ValidationError("Введите на входе либо температуру, либо энтальпию.")
+        # Пустые необязательные поля — значения по умолчанию calculator.pipe.solve
+        return {name: value for name, value in cleaned_data.items() if value is not None}
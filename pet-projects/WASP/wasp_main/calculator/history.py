@@ -0,0 +1,98 @@
+"""История расчётов в БД (models.CalculationRecord).
+
+Ключ записи — нормализованные входные данные, как у кэша состояний, с
+уникальным индексом: повторный запрос обслуживается одним поиском по
+индексу, пакет — запросами key IN (...) порциями по BATCH_SIZE ключей.
+Новые результаты пакета пишутся одним bulk_create; конфликты ключей
+(тот же расчёт из другого процесса) пропускаются.
+
+Ключ начинается с VERSION — версии iapws и формата результата
+(RESULT_VERSION): записи другой версии не находятся и не мешают записать
+новые.
+
+В записи хранятся только основные поля состояния (engine.base_dict):
+сохранение не считает вязкость и расширенные свойства, прочитанное
+состояние досчитает их при обращении.
+
+Отключается настройкой CALCULATOR_HISTORY = False.
+"""
+import threading
+
+import iapws
+from django.conf import settings
+
+from .cache import key_string, normalize
+from .engine import base_dict, state_from_dict
+from .models import CalculationRecord
+
+BATCH_SIZE = 500
+# Менять при изменении формата поля result
+RESULT_VERSION = 3
+VERSION = f'iapws-{iapws.__version__}:r{RESULT_VERSION}'
+
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0}
+
+
+def enabled():
+    return getattr(settings, 'CALCULATOR_HISTORY', True)
+
+
+def key_of(mode, inputs, fast=False):
+    return _versioned(normalize(mode, fast, **inputs)[0])
+
+
+def _versioned(key):
+    return f'{VERSION}:{key_string(key)}'
+
+
+def _count(hits, misses):
+    with _lock:
+        _counters['hits'] += hits
+        _counters['misses'] += misses
+
+
+def lookup_many(keys):
+    """Сохранённые состояния по ключам: {ключ: состояние}."""
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    for i in range(0, len(keys), BATCH_SIZE):
+        rows = CalculationRecord.objects.filter(key__in=keys[i:i + BATCH_SIZE]).values_list('key', 'result')
+        for key, result in rows:
+            found[key] = state_from_dict(result)
+    _count(len(found), len(keys) - len(found))
+    return found
+
+
+async def alookup(key):
+    result = await CalculationRecord.objects.filter(key=key).values_list('result', flat=True).afirst()
+    _count(result is not None, result is None)
+    return state_from_dict(result) if result is not None else None
+
+
+def _record(mode, inputs, fast, state):
+    key, normalized, fast = normalize(mode, fast, **inputs)
+    return CalculationRecord(
+        key=_versioned(key), mode=mode, fast=fast, result=base_dict(state),
+        pressure=normalized.get('pressure'), temperature=normalized.get('temperature'),
+        enthalpy=normalized.get('enthalpy'),
+    )
+
+
+def record_many(items):
+    """Сохранить [(mode, inputs, fast, состояние)] одним bulk_create."""
+    records = [_record(*item) for item in items]
+    CalculationRecord.objects.bulk_create(records, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+async def arecord(mode, inputs, fast, state):
+    await CalculationRecord.objects.abulk_create([_record(mode, inputs, fast, state)], ignore_conflicts=True)
+
+
+def stats():
+    with _lock:
+        stats = dict(_counters)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    stats['records'] = CalculationRecord.objects.count()
+    return stats
@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator import benchmark, parallel
+
+
+class Command(BaseCommand):
+    help = ('Замеры задержки (p50/p95/p99) и пропускной способности расчёта по всем режимам: '
+            'весь диапазон, окрестность критической точки и границы областей IF97.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Точек в каждом наборе.')
+        parser.add_argument('--repeat', type=int, default=1, help='Повторов каждого набора.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--fast', action='store_true', help='Быстрый режим (сплайновые таблицы).')
+        parser.add_argument('--mode', action='append', choices=list(benchmark.SWEEPS),
+                            help='Только этот режим; можно указать несколько раз.')
+        parser.add_argument('--scaling', action='store_true',
+                            help='Замерить пакетный расчёт в пуле процессов на 1, 2 и N воркерах.')
+        parser.add_argument('--workers', type=int, action='append',
+                            help='Число воркеров для --scaling; можно указать несколько раз.')
+        parser.add_argument('--output', help='Записать результат в JSON-файл.')
+        parser.add_argument('--baseline', help='JSON прошлого запуска для сравнения.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимое замедление p50/p95 относительно baseline (0.2 — 20%%).')
+
+    def handle(self, *args, **options):
+        result = benchmark.run(
+            count=options['count'], repeat=options['repeat'], fast=options['fast'],
+            seed=options['seed'], modes=options['mode'],
+        )
+        self.stdout.write(f"{'набор':<26}{'p50, мкс':>10}{'p95, мкс':>10}{'p99, мкс':>10}{'точек/с':>10}{'ошибок':>8}")
+        for name, case in result['cases'].items():
+            if 'p50_us' not in case:
+                self.stdout.write(f"{name:<26}{'—':>40}{case['errors']:>8}")
+                continue
+            self.stdout.write(
+                f"{name:<26}{case['p50_us']:>10.1f}{case['p95_us']:>10.1f}{case['p99_us']:>10.1f}"
+                f"{case['throughput']:>10.0f}{case['errors']:>8}"
+            )
+        if options['scaling']:
+            try:
+                result['scaling'] = benchmark.scaling(
+                    count=options['count'] * 10, workers=options['workers'], fast=options['fast'], seed=options['seed'],
+                )
+            finally:
+                parallel.shutdown()
+            self.stdout.write(f"\n{'воркеров':<26}{'с':>10}{'точек/с':>10}{'ускорение':>10}")
+            for workers, case in result['scaling']['workers'].items():
+                self.stdout.write(
+                    f"{workers:<26}{case['seconds']:>10.2f}{case['throughput']:>10.0f}{case['speedup']:>10.2f}"
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            slower = benchmark.compare(result, baseline, options['threshold'])
+            for name, metric, before, after in slower:
+                self.stderr.write(f'{name}: {metric} {before:.1f} → {after:.1f} мкс')
+            if slower:
+                raise CommandError(f'Замедление больше {options["threshold"]:.0%} в {len(slower)} замерах.')
+            self.stdout.write(self.style.SUCCESS('Замедлений относительно baseline нет.'))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator import tablefile
+
+
+class Command(BaseCommand):
+    help = ('Построить таблицы калькулятора (линия насыщения, индекс областей IF97, таблицы '
+            'быстрого режима) и записать в файл, который воркеры отображают в память.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Путь к файлу; по умолчанию CALCULATOR_TABLES_FILE.')
+        parser.add_argument('--section', action='append', choices=('saturation', 'regions', 'sbtl'),
+                            help='Только этот раздел; можно указать несколько раз.')
+        parser.add_argument('--check', action='store_true',
+                            help='Не строить, а проверить существующий файл.')
+
+    def handle(self, *args, **options):
+        path = options['output'] or getattr(settings, 'CALCULATOR_TABLES_FILE', None)
+        if not path:
+            raise CommandError('Укажите --output или CALCULATOR_TABLES_FILE в настройках.')
+        if options['check']:
+            try:
+                header = tablefile.read(path)[0]
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: таблицы годны (iapws {header['iapws']}, {header['size']} байт данных)."
+            ))
+            return
+        started = time.perf_counter()
+        header = tablefile.build(path, options['section'])
+        for name, spec in header['arrays'].items():
+            self.stdout.write(f"{name:<20}{' × '.join(map(str, spec['shape'])):>24}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{path}: {header['size']} байт данных за {time.perf_counter() - started:.1f} с, "
+            f"iapws {header['iapws']}, sha256 {header['sha256'][:16]}…"
+        ))
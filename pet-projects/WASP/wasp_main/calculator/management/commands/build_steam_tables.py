@@ -0,0 +1,32 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator import steamtables
+
+
+class Command(BaseCommand):
+    help = ('Рассчитать таблицы воды и пара (насыщение по T и по P, перегретый пар) и записать '
+            'готовые страницы HTML и CSV с их gzip в каталог текущей версии iapws.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Каталог; по умолчанию подкаталог версии iapws '
+                                             'в CALCULATOR_STEAM_TABLES_DIR.')
+        parser.add_argument('--table', action='append', choices=tuple(steamtables.TABLES),
+                            help='Только эта таблица; можно указать несколько раз.')
+
+    def handle(self, *args, **options):
+        path = options['output'] or steamtables.directory()
+        if not path:
+            raise CommandError('Укажите --output или CALCULATOR_STEAM_TABLES_DIR в настройках.')
+        for name in options['table'] or steamtables.TABLES:
+            started = time.perf_counter()
+            contents = steamtables.build(name)
+            steamtables.write(path, name, contents)
+            sizes = ', '.join(
+                f"{fmt} {len(content)} байт (gzip {os.path.getsize(os.path.join(path, f'{name}.{fmt}.gz'))})"
+                for fmt, content in contents.items()
+            )
+            self.stdout.write(f'{name:<14}{sizes}, {time.perf_counter() - started:.2f} с')
+        self.stdout.write(self.style.SUCCESS(f'Таблицы записаны в {path}.'))
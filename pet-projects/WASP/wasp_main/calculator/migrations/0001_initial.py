@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalculationRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True, verbose_name='ключ')),
+                ('mode', models.CharField(max_length=20, verbose_name='режим')),
+                ('fast', models.BooleanField(default=False, verbose_name='быстрый режим')),
+                ('pressure', models.FloatField(blank=True, null=True, verbose_name='давление, МПа')),
+                ('temperature', models.FloatField(blank=True, null=True, verbose_name='температура, °C')),
+                ('enthalpy', models.FloatField(blank=True, null=True, verbose_name='энтальпия, кДж/кг')),
+                ('result', models.JSONField(verbose_name='результат')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создан')),
+            ],
+            options={
+                'verbose_name': 'расчёт',
+                'verbose_name_plural': 'история расчётов',
+            },
+        ),
+    ]
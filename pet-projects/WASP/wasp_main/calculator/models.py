@@ -1,3 +1,21 @@
 from django.db import models
 
-# Create your models here.
+
+class CalculationRecord(models.Model):
+    # Ключ — нормализованные входные данные, как у кэша состояний (calculator.cache)
+    key = models.CharField('ключ', max_length=200, unique=True)
+    mode = models.CharField('режим', max_length=20)
+    fast = models.BooleanField('быстрый режим', default=False)
+    pressure = models.FloatField('давление, МПа', null=True, blank=True)
+    temperature = models.FloatField('температура, °C', null=True, blank=True)
+    enthalpy = models.FloatField('энтальпия, кДж/кг', null=True, blank=True)
+    # Результат — engine.base_dict(): основные поля State или SaturationState
+    result = models.JSONField('результат')
+    created_at = models.DateTimeField('создан', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'расчёт'
+        verbose_name_plural = 'история расчётов'
+
+    def __str__(self):
+        return self.key
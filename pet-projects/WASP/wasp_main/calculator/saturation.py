@@ -0,0 +1,144 @@
+"""Таблица линии насыщения с монотонной интерполяцией.
+
+Таблица строится один раз на процесс на равномерной сетке по T от 0.01 °C
+и хранит P, h', h'', s', s'', v', v'', mu', mu''. Свойства фаз берутся
+кубической монотонной интерполяцией (PCHIP), v и mu — в логарифмах.
+Температура по давлению и давление по температуре считаются точными
+уравнениями насыщения IF97, как и в IAPWS97.
+
+Сетка кончается на 350 °C: выше IAPWS97 берёт свойства насыщения из
+обратных уравнений области 3 с подобластями, и они не гладкие — интерполяция
+там даёт до 1e-2 отн. у критической точки. Выше TMAX lookup_* возвращают
+None и расчёт идёт точно.
+
+Максимальное отклонение от IAPWS97(x=0/1) по verify() (середины всех
+интервалов сетки): 1.02e-6 отн. (s'), по остальным свойствам меньше;
+гарантируемая граница — ERROR_BOUND = 2e-6.
+
+Если задан файл таблиц (calculator.tablefile), узлы и коэффициенты сплайна
+берутся из него без расчёта.
+"""
+import math
+import threading
+
+import numpy as np
+from iapws import IAPWS97
+from iapws._iapws import _Viscosity
+from iapws.iapws97 import _PSat_T, _Region1, _Region2, _TSat_P
+from scipy.interpolate import PchipInterpolator, PPoly
+
+from . import tablefile
+
+TMIN = 273.16
+TMAX = 623.15
+GRID = 1200
+# Граница относительной ошибки таблицы по всем свойствам (проверяется verify())
+ERROR_BOUND = 2e-6
+# Запас от линий насыщения в долях теплоты парообразования: с ним ошибка таблицы
+# по h' и h'' (до 2e-6 отн.) не относит к куполу точки областей 1 и 2
+WET_MARGIN = 1e-5
+
+_lock = threading.Lock()
+_table = None
+
+
+class _Table:
+    def __init__(self, arrays):
+        # T — узлы сетки; rows — P, h', h'', s', s'', v', v'', mu', mu'';
+        # c — коэффициенты PCHIP по h', h'', s', s'', ln v', ln v'', ln mu', ln mu''
+        self.arrays = arrays
+        self.T = arrays['T']
+        self.rows = arrays['rows']
+        self.spline = PPoly.construct_fast(arrays['c'], self.T)
+        self.p_min = float(self.rows[0, 0])
+        self.p_max = float(self.rows[-1, 0])
+
+    @classmethod
+    def build(cls):
+        T = np.linspace(TMIN, TMAX, GRID)
+        rows = np.empty((GRID, 9))
+        for i, Ti in enumerate(T):
+            P = _PSat_T(Ti)
+            water, steam = _Region1(Ti, P), _Region2(Ti, P)
+            rows[i] = (
+                P, water['h'], steam['h'], water['s'], steam['s'], water['v'], steam['v'],
+                _Viscosity(1 / water['v'], Ti), _Viscosity(1 / steam['v'], Ti),
+            )
+        columns = rows[:, 1:].copy()
+        columns[:, 4:] = np.log(columns[:, 4:])
+        return cls({'T': T, 'rows': rows, 'c': PchipInterpolator(T, columns).c})
+
+    def phases(self, T):
+        # Свойства (h, s, v, mu) воды и пара при температуре T [К]
+        h1, h2, s1, s2, lnv1, lnv2, lnmu1, lnmu2 = self.spline(T).tolist()
+        return (
+            (h1, s1, math.exp(lnv1), math.exp(lnmu1)),
+            (h2, s2, math.exp(lnv2), math.exp(lnmu2)),
+        )
+
+
+def get_table():
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                arrays = tablefile.section('saturation')
+                _table = _Table(arrays) if arrays is not None else _Table.build()
+    return _table
+
+
+def build_arrays():
+    """Массивы таблицы для файла таблиц: всегда новый расчёт."""
+    return _Table.build().arrays
+
+
+def lookup_T(T):
+    """Насыщение по T [К]: (P, вода, пар) или None; фаза — (h, s, v, mu)."""
+    if not (TMIN <= T <= TMAX):
+        return None
+    return (_PSat_T(T),) + get_table().phases(T)
+
+
+def lookup_P(P):
+    """Насыщение по P [МПа]: (T, вода, пар) или None; фаза — (h, s, v, mu)."""
+    table = get_table()
+    if not (table.p_min <= P <= table.p_max):
+        return None
+    T = _TSat_P(P)
+    return (T,) + table.phases(T)
+
+
+def lookup_wet(P, h):
+    """Точка (P [МПа], h [кДж/кг]) внутри купола: (T, x, s, v) или None."""
+    sat = lookup_P(P)
+    if sat is None:
+        return None
+    T, (h1, s1, v1, _), (h2, s2, v2, _) = sat
+    margin = WET_MARGIN * (h2 - h1)
+    if not (h1 + margin < h < h2 - margin):
+        return None
+    x = (h - h1) / (h2 - h1)
+    return T, x, s1 + x * (s2 - s1), v1 + x * (v2 - v1)
+
+
+def verify(points=None, seed=0):
+    """Максимальное относительное отклонение таблицы от IAPWS97 по свойствам.
+
+    Проверяются середины интервалов сетки: все или points случайных (seed)
+    и крайние — у концов сетки сплайн ошибается больше всего.
+    """
+    table = get_table()
+    names = ('h', 's', 'v', 'mu')
+    deviation = {f'{name}{prime}': 0.0 for name in names for prime in ("'", "''")}
+    middles = (table.T[:-1] + table.T[1:]) / 2
+    if points is not None:
+        sample = np.random.default_rng(seed).choice(len(middles) - 2, min(points, len(middles) - 2), replace=False)
+        middles = middles[np.concatenate(([0, len(middles) - 1], sample + 1))]
+    for T in middles:
+        fast = table.phases(T)
+        for prime, phase, x in (("'", fast[0], 0), ("''", fast[1], 1)):
+            exact = IAPWS97(T=T, x=x)
+            for name, value in zip(names, phase):
+                key = name + prime
+                deviation[key] = max(deviation[key], abs(value / getattr(exact, name) - 1))
+    return deviation
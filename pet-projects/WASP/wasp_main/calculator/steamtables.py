@@ -0,0 +1,201 @@
+"""Готовые страницы таблиц водяного пара.
+
+Таблицы (TABLES): насыщение по температуре, насыщение по давлению и
+перегретый пар на сетке P × T. При сверхкритических давлениях в таблицу
+пара идут только температуры выше псевдокритической (максимум cp на
+изобаре): ниже неё флюид по плотности — сжатая жидкость. Каждая
+строится один раз на версию iapws: расчёт engine.compute_state, HTML по
+шаблону calculator/steam_table.html и CSV, оба — сразу и в gzip. Запрос
+получает готовые байты (Page) без расчёта IAPWS97 и без шаблонизатора.
+
+Где хранятся страницы (settings.CALCULATOR_STEAM_TABLES_DIR):
+    None   — в памяти процесса, строятся при первом запросе таблицы;
+    путь   — в каталоге iapws-<версия>-v<FORMAT_VERSION>: команда
+             build_steam_tables строит их заранее, недостающие строятся
+             при первом запросе и записываются туда же.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import os
+import threading
+from dataclasses import dataclass
+
+import iapws
+from django.conf import settings
+from django.template.loader import render_to_string
+from scipy.optimize import minimize_scalar
+
+from .engine import compute_state
+
+# Менять при изменении сеток, столбцов или шаблона — старые файлы не подойдут
+FORMAT_VERSION = 2
+TABLES = {
+    'saturation-T': 'Насыщение по температуре',
+    'saturation-P': 'Насыщение по давлению',
+    'superheated': 'Перегретый пар',
+}
+FORMATS = {
+    'html': 'text/html; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+SATURATION_TEMPERATURES = (0.01,) + tuple(range(5, 375, 5)) + (373,)
+SATURATION_PRESSURES = tuple(
+    round(decade * step, 6)
+    for decade in (0.001, 0.01, 0.1, 1, 10)
+    for step in (1, 1.5, 2, 3, 4, 5, 6, 7, 8, 9)
+    if decade * step < 22.064
+) + (22,)
+SUPERHEATED_PRESSURES = (0.01, 0.05, 0.1, 0.2, 0.5, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 25, 30, 40, 50)
+SUPERHEATED_TEMPERATURES = tuple(range(50, 850, 50))
+
+SATURATION_COLUMNS = ('T', 'P', 'v_water', 'v_steam', 'h_water', 'h_steam', 'r', 's_water', 's_steam')
+SUPERHEATED_COLUMNS = ('P', 'T', 'v', 'h', 's', 'x')
+
+_lock = threading.Lock()
+_pages = {}
+
+
+@dataclass(slots=True)
+class Page:
+    content: bytes
+    compressed: bytes
+    etag: str
+    content_type: str
+
+
+def directory():
+    # Каталог страниц текущей версии iapws или None
+    root = getattr(settings, 'CALCULATOR_STEAM_TABLES_DIR', None)
+    if not root:
+        return None
+    return os.path.join(root, f'iapws-{iapws.__version__}-v{FORMAT_VERSION}')
+
+
+def _page(content, fmt, compressed=None):
+    # mtime=0 — одинаковый gzip для одинаковых страниц во всех воркерах
+    return Page(
+        content=content,
+        compressed=compressed or gzip.compress(content, compresslevel=9, mtime=0),
+        etag=hashlib.sha256(content).hexdigest()[:32],
+        content_type=FORMATS[fmt],
+    )
+
+
+def get(name, fmt):
+    """Готовая страница таблицы name в формате fmt ('html' или 'csv')."""
+    key = (name, fmt)
+    page = _pages.get(key)
+    if page is None:
+        with _lock:
+            page = _pages.get(key)
+            if page is None:
+                _pages.update(_load(name))
+                page = _pages[key]
+    return page
+
+
+def _load(name):
+    # Страницы таблицы из каталога, иначе построенные заново (и записанные в каталог)
+    path = directory()
+    if path is not None:
+        try:
+            return {(name, fmt): _read(path, name, fmt) for fmt in FORMATS}
+        except OSError:
+            pass
+    contents = build(name)
+    if path is not None:
+        write(path, name, contents)
+    return {(name, fmt): _page(content, fmt) for fmt, content in contents.items()}
+
+
+def _read(path, name, fmt):
+    with open(os.path.join(path, f'{name}.{fmt}'), 'rb') as f:
+        content = f.read()
+    with open(os.path.join(path, f'{name}.{fmt}.gz'), 'rb') as f:
+        compressed = f.read()
+    return _page(content, fmt, compressed)
+
+
+def write(path, name, contents):
+    """Записать страницы {формат: байты} таблицы name и их gzip в каталог path."""
+    os.makedirs(path, exist_ok=True)
+    for fmt, content in contents.items():
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        for filename, data in ((f'{name}.{fmt}', content), (f'{name}.{fmt}.gz', compressed)):
+            # Запись во временный файл и замена: соседний воркер не прочитает половину
+            temporary = os.path.join(path, f'{filename}.{os.getpid()}.tmp')
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, os.path.join(path, filename))
+
+
+def build(name):
+    """Рассчитать таблицу name: {'html': байты, 'csv': байты}."""
+    if name not in TABLES:
+        raise KeyError(name)
+    if name == 'superheated':
+        columns, rows = SUPERHEATED_COLUMNS, _superheated_rows()
+    else:
+        columns, rows = SATURATION_COLUMNS, _saturation_rows(name)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    writer.writerows([row[column] for column in columns] for row in rows)
+    html = render_to_string('calculator/steam_table.html', {
+        'name': name,
+        'title': TABLES[name],
+        'tables': TABLES,
+        'rows': rows,
+        'iapws_version': iapws.__version__,
+    })
+    return {'html': html.encode(), 'csv': buffer.getvalue().encode()}
+
+
+def _saturation_rows(name):
+    if name == 'saturation-T':
+        states = [compute_state('saturation-T', temperature=T) for T in SATURATION_TEMPERATURES]
+    else:
+        states = [compute_state('saturation-P', pressure=P) for P in SATURATION_PRESSURES]
+    return [{
+        'T': state.T,
+        'P': state.P,
+        'v_water': state.water.v,
+        'v_steam': state.steam.v,
+        'h_water': state.water.h,
+        'h_steam': state.steam.h,
+        'r': state.steam.h - state.water.h,
+        's_water': state.water.s,
+        's_steam': state.steam.s,
+    } for state in states]
+
+
+def pseudocritical_temperature(P):
+    """Псевдокритическая температура [°C] при сверхкритическом давлении P: максимум cp на изобаре."""
+    result = minimize_scalar(
+        lambda T: -compute_state('P-T-steam', pressure=P, temperature=T).cp,
+        bounds=(373.946, 800), method='bounded', options={'xatol': 1e-3},
+    )
+    return result.x
+
+
+def _superheated_rows():
+    # Ниже критического давления — строка насыщенного пара (x = 1), затем T > Ts;
+    # выше — только T больше псевдокритической
+    rows = []
+    for P in SUPERHEATED_PRESSURES:
+        if P < 22.064:
+            sat = compute_state('saturation-P', pressure=P)
+            T_min = sat.T
+            rows.append({'P': P, 'T': sat.T, 'v': sat.steam.v, 'h': sat.steam.h, 's': sat.steam.s, 'x': 1,
+                         'saturated': True})
+        else:
+            T_min = pseudocritical_temperature(P)
+        for T in SUPERHEATED_TEMPERATURES:
+            if T <= T_min:
+                continue
+            state = compute_state('P-T-steam', pressure=P, temperature=T)
+            rows.append({'P': P, 'T': T, 'v': state.v, 'h': state.h, 's': state.s, 'x': state.x,
+                         'saturated': False})
+    return rows
@@ -0,0 +1,213 @@
+"""Таблицы по изобаре и изотерме с тёплым стартом итераций.
+
+Виды таблиц (SWEEPS):
+    'isobar-T' — P постоянно, T от start до stop с шагом step (режим P-T);
+    'isobar-H' — P постоянно, h от start до stop (режим P-H);
+    'isotherm' — T постоянно, P от start до stop (режим P-T).
+
+Область и итерации те же, что у engine.compute_state, но на изобаре
+границы областей по h (h', h'', B23, 1073.15 К) считаются один раз на
+таблицу, а итерации стартуют от соседней точки: T по h — из линейного
+прогноза T + (h - h_соседа) / cp_соседа с шагами Ньютона по cp. Плотность
+в области 3 по (P, T) начинается с обратного уравнения v(P, T) и
+уточняется шагами Ньютона по аналитической производной: прогноз от соседа
+там опасен — у линии насыщения (16.5–22.064 МПа) он уводит на метастабильный
+корень другой фазы. Точки, которые так не считаются, досчитываются обычным
+compute_state — с теми же ошибками.
+"""
+import math
+
+from iapws.iapws97 import (
+    Pmin, Ps_623, _Backward1_T_Ph, _Backward2_T_Ph, _Backward3_T_Ph, _Backward3_v_Ph,
+    _Backward3_v_PT, _PSat_h, _Region1, _Region2, _Region3, _Region4, _Region5,
+    _t_P, _TSat_P,
+)
+from iapws._iapws import Pc, Tc, rhoc
+from scipy.optimize import fsolve
+
+from . import regions
+from .engine import region_state
+from .parallel import compute_one
+
+SWEEPS = {
+    'isobar-T': ('P-T-water', 'pressure', 'temperature'),
+    'isobar-H': ('P-H', 'pressure', 'enthalpy'),
+    'isotherm': ('P-T-water', 'temperature', 'pressure'),
+}
+# Невязка по h [кДж/кг], относительный шаг по плотности и число шагов Ньютона
+H_TOLERANCE = 1e-8
+RHO_TOLERANCE = 1e-12
+MAX_STEPS = 20
+
+
+def count(start, stop, step):
+    """Число точек от start до stop включительно с шагом step > 0 — без построения списка."""
+    if not all(math.isfinite(value) for value in (start, stop, step)):
+        raise ValueError("Границы и шаг должны быть конечными числами")
+    if step <= 0:
+        raise ValueError("Шаг должен быть положительным")
+    if stop < start:
+        raise ValueError("Конец диапазона меньше начала")
+    return math.floor((stop - start) / step + 1e-9) + 1
+
+
+def values(start, stop, step):
+    """Значения от start до stop включительно с шагом step > 0."""
+    return [round(start + i * step, 10) for i in range(count(start, stop, step))]
+
+
+def compute_sweep(sweep, fixed, start, stop, step, fast=False):
+    """Таблица вида sweep: [(состояние, None) или (None, ошибка)] по точкам диапазона."""
+    mode, fixed_name, variable = SWEEPS[sweep]
+    points = [{fixed_name: fixed, variable: value} for value in values(start, stop, step)]
+    if fast:
+        # Сплайновые таблицы не итерируют — тёплый старт им не нужен
+        return [compute_one(mode, point, fast) for point in points]
+    if sweep == 'isobar-H' and Pmin <= fixed < 100:
+        solver = _Isobar(fixed)
+        return [_solved(mode, point, solver.state) for point in points]
+    return [_solved(mode, point, _pt_state) for point in points]
+
+
+def _solved(mode, point, solve):
+    if 0.000611 < point['pressure'] < 100:
+        try:
+            props = solve(point)
+        except Exception:
+            props = None
+        if props is not None:
+            return region_state(mode, props), None
+    return compute_one(mode, point)
+
+
+def _pt_state(point):
+    P, T = point['pressure'], point['temperature'] + 273.15
+    region = regions.classify_pt(P, T)
+    if region == 1:
+        return _Region1(T, P)
+    if region == 2:
+        return _Region2(T, P)
+    if region == 5:
+        return _Region5(T, P)
+    if region == 3:
+        if T == Tc and P == Pc:
+            return _Region3(rhoc, T)
+        # Обратное уравнение выбирает подобласть 3a…3z, то есть фазу, — корень тот же, что у compute_state
+        return _newton_rho(1 / _Backward3_v_PT(P, T), T, P)
+    return None
+
+
+def _newton_rho(rho, T, P):
+    # Шаги Ньютона по плотности: dP/drho = 1 / (rho kt)
+    for _ in range(MAX_STEPS):
+        props = _Region3(rho, T)
+        step = (props['P'] - P) * rho * props['kt']
+        if abs(step) <= RHO_TOLERANCE * rho:
+            return props
+        rho -= step
+    return None
+
+
+class _Isobar:
+    # Границы областей по h на изобаре P — как в _Bound_Ph, но один раз на таблицу
+    def __init__(self, P):
+        self.P = P
+        self.previous = None
+        self.h_min = _Region1(273.15, P)['h']
+        self.h25 = _Region2(1073.15, P)['h']
+        self.h_max = _Region5(2273.15, P)['h']
+        if P <= Ps_623:
+            self.T_sat = _TSat_P(P)
+            self.water, self.steam = _Region1(self.T_sat, P), _Region2(self.T_sat, P)
+            self.h_low, self.h_high = self.water['h'], self.steam['h']
+        else:
+            # Между Ps_623 и Pc двухфазная часть области 3 — насыщение по уравнениям области 3
+            self.h_sat = None
+            self.h_low = _Region1(623.15, P)['h']
+            self.h_high = _Region2(_t_P(P), P)['h']
+
+    def region(self, h):
+        P = self.P
+        if self.h_min <= h <= self.h_low:
+            return 1
+        if self.h_low < h < self.h_high:
+            if P <= Ps_623:
+                return 4
+            if P >= Pc:
+                return 3
+            try:
+                p34 = _PSat_h(h)
+            except NotImplementedError:
+                p34 = Ps_623
+            return 4 if P < p34 else 3
+        if self.h_high <= h <= self.h25:
+            return 2
+        if self.h25 < h <= self.h_max and P <= 50:
+            return 5
+        return None
+
+    def state(self, point):
+        P, h = self.P, point['enthalpy']
+        region = self.region(h)
+        previous, self.previous = self.previous, None
+        if previous is not None and previous[0] != region:
+            previous = None
+        if region in (1, 2, 5):
+            equation = {1: _Region1, 2: _Region2, 5: _Region5}[region]
+            if previous is not None:
+                props = previous[1]
+                T = props['T'] + (h - props['h']) / props['cp']
+            elif region == 1:
+                T = _Backward1_T_Ph(P, h)
+            elif region == 2:
+                T = _Backward2_T_Ph(P, h)
+            else:
+                T = 1500
+            props = self._newton(equation, T, h)
+        elif region == 3:
+            if previous is not None:
+                props = previous[1]
+                guess = [1 / props['v'], props['T']]
+            else:
+                guess = [1 / _Backward3_v_Ph(P, h), _Backward3_T_Ph(P, h)]
+
+            def residual(par):
+                props = _Region3(par[0], par[1])
+                return props['h'] - h, props['P'] - P
+
+            rho, T = fsolve(residual, guess)
+            props = _Region3(rho, T)
+        elif region == 4 and P <= Ps_623:
+            props = self._wet(h)
+        elif region == 4:
+            if self.h_sat is None:
+                self.h_sat = _Region4(P, 0)['h'], _Region4(P, 1)['h']
+            h1, h2 = self.h_sat
+            props = _Region4(P, (h - h1) / (h2 - h1))
+        else:
+            return None
+        if props is not None:
+            self.previous = (region, props)
+        return props
+
+    def _wet(self, h):
+        water, steam = self.water, self.steam
+        x = (h - water['h']) / (steam['h'] - water['h'])
+        return {
+            'T': self.T_sat,
+            'P': self.P,
+            'x': x,
+            'region': 4,
+            'h': water['h'] + x * (steam['h'] - water['h']),
+            's': water['s'] + x * (steam['s'] - water['s']),
+            'v': water['v'] + x * (steam['v'] - water['v']),
+        }
+
+    def _newton(self, equation, T, h):
+        for _ in range(MAX_STEPS):
+            props = equation(T, self.P)
+            error = props['h'] - h
+            if abs(error) <= H_TOLERANCE:
+                return props
+            T -= error / props['cp']
+        return None
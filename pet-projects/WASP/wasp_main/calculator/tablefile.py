@@ -0,0 +1,175 @@
+"""Файл таблиц калькулятора, общий для всех воркеров.
+
+Команда build_calculator_tables один раз строит таблицы (линия насыщения
+calculator.saturation, индекс областей calculator.regions, сплайновые
+таблицы быстрого режима calculator.sbtl) и пишет их в двоичный файл:
+
+    MAGIC, длина заголовка (8 байт, little-endian), заголовок JSON, массивы.
+
+Заголовок хранит версию формата, версию iapws, параметры сеток, размещение
+массивов и sha256 области данных; массивы выровнены по ALIGN байт. Процесс
+отображает файл через mmap только для чтения, и массивы numpy смотрят прямо
+в отображение: N воркеров делят одну копию в страничном кэше ОС, а запуск
+не требует расчёта IAPWS97.
+
+Файл с другой версией формата или iapws, другими параметрами сеток или
+несовпадающей контрольной суммой отвергается: section() возвращает None, и
+модули строят таблицы сами, как без файла. Модуль не зависит от Django:
+путь задаёт configure() (CalculatorConfig.ready — из CALCULATOR_TABLES_FILE).
+"""
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import threading
+
+import iapws
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'WASPTAB\n'
+FORMAT_VERSION = 1
+ALIGN = 64
+
+_lock = threading.Lock()
+_path = None
+# None — файл ещё не открывался; {} — файла нет или он отвергнут
+_sections = None
+
+
+def parameters():
+    # Параметры сеток: таблицы, построенные с другими, к этому коду не подходят
+    from . import regions, saturation, sbtl
+    return {
+        'saturation': {'TMIN': saturation.TMIN, 'TMAX': saturation.TMAX, 'GRID': saturation.GRID},
+        'regions': {'PMAX': regions.PMAX, 'GRID': regions.GRID},
+        'sbtl': {
+            'PMAX': sbtl.PMAX, 'TMIN': sbtl.TMIN, 'TMAX': sbtl.TMAX,
+            'GRID_P': sbtl.GRID_P, 'GRID_U': sbtl.GRID_U,
+        },
+    }
+
+
+def _builders():
+    from . import regions, saturation, sbtl
+    return {
+        'saturation': saturation.build_arrays,
+        'regions': regions.build_arrays,
+        'sbtl': sbtl.build_arrays,
+    }
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def build(path, sections=None):
+    """Построить таблицы разделов sections (по умолчанию все) и записать в path; заголовок файла."""
+    builders = _builders()
+    unknown = set(sections or ()) - set(builders)
+    if unknown:
+        raise ValueError(f"Неизвестные разделы таблиц: {', '.join(sorted(unknown))}")
+    arrays = {}
+    for name in sections or builders:
+        for key, array in builders[name]().items():
+            arrays[f'{name}/{key}'] = np.ascontiguousarray(array, dtype='<f8')
+    return write(path, arrays)
+
+
+def write(path, arrays):
+    """Записать массивы {'раздел/имя': массив} в path; заголовок файла."""
+    layout = {}
+    size = 0
+    for name, array in arrays.items():
+        offset = _aligned(size)
+        layout[name] = {'offset': offset, 'shape': list(array.shape), 'dtype': array.dtype.str}
+        size = offset + array.nbytes
+    data = bytearray(size)
+    for name, array in arrays.items():
+        offset = layout[name]['offset']
+        data[offset:offset + array.nbytes] = array.tobytes()
+    header = {
+        'format': FORMAT_VERSION,
+        'iapws': iapws.__version__,
+        'parameters': parameters(),
+        'arrays': layout,
+        'size': size,
+        'sha256': hashlib.sha256(data).hexdigest(),
+    }
+    encoded = json.dumps(header, sort_keys=True).encode()
+    start = _aligned(len(MAGIC) + 8 + len(encoded))
+    # Запись во временный файл и замена: воркеры, уже отобразившие старый файл,
+    # дочитывают его, новые открывают новый
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(MAGIC + len(encoded).to_bytes(8, 'little') + encoded)
+        f.write(bytes(start - f.tell()))
+        f.write(data)
+    os.replace(temporary, path)
+    return header
+
+
+def read(path):
+    """Заголовок и массивы файла таблиц (только чтение, без копирования); ValueError, если файл устарел."""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path}: не файл таблиц калькулятора")
+    length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+    header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+    start = _aligned(len(MAGIC) + 8 + length)
+    if header.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{path}: формат {header.get('format')}, нужен {FORMAT_VERSION}")
+    if header.get('iapws') != iapws.__version__:
+        raise ValueError(f"{path}: таблицы построены iapws {header.get('iapws')}, установлен {iapws.__version__}")
+    if header.get('parameters') != json.loads(json.dumps(parameters())):
+        raise ValueError(f"{path}: параметры сеток не совпадают с текущими")
+    if len(buffer) != start + header['size']:
+        raise ValueError(f"{path}: размер файла не совпадает с заголовком")
+    with memoryview(buffer) as view:
+        checksum = hashlib.sha256(view[start:]).hexdigest()
+    if checksum != header['sha256']:
+        raise ValueError(f"{path}: контрольная сумма не совпадает")
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        arrays[name] = np.frombuffer(
+            buffer, dtype=spec['dtype'], count=math.prod(spec['shape']), offset=start + spec['offset'],
+        ).reshape(spec['shape'])
+    return header, arrays
+
+
+def configure(path):
+    """Брать таблицы из файла path (None — строить в процессе)."""
+    global _path, _sections
+    with _lock:
+        _path = path
+        _sections = None
+
+
+def section(name):
+    """Массивы раздела name из файла таблиц или None, если файла нет или он отвергнут."""
+    global _sections
+    if _sections is None:
+        with _lock:
+            if _sections is None:
+                _sections = _load(_path)
+    return _sections.get(name)
+
+
+def _load(path):
+    if not path:
+        return {}
+    try:
+        header, arrays = read(path)
+    except (OSError, ValueError) as e:
+        logger.warning('Файл таблиц не используется, таблицы строятся в процессе: %s', e)
+        return {}
+    sections = {}
+    for key, array in arrays.items():
+        name, field = key.split('/', 1)
+        sections.setdefault(name, {})[field] = array
+    logger.info('Таблицы калькулятора отображены из %s (iapws %s)', path, header['iapws'])
+    return sections
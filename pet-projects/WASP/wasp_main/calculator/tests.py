@@ -1,3 +1,806 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+from unittest import mock
 
-# Create your tests here.
+import iapws
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from iapws import IAPWS97
+from iapws.iapws97 import _h_3ab, _t_P, _TSat_P
+
+from . import (
+    columnar, cycle, history, parallel, pipe, regions, saturation, sbtl, steamtables, sweep, tablefile, vectorized,
+    views,
+)
+from .cache import SingleFlight, StateCache, get_state_cache
+from .engine import EXTENDED_PROPERTIES, compute_state
+from .models import CalculationRecord
+
+
+class EngineTests(SimpleTestCase):
+    # Движок против полного IAPWS97 по точкам всех областей
+    def assertMatches(self, state, reference, names=('T', 'h', 's', 'v', 'x')):
+        for name in names:
+            expected = getattr(reference, name)
+            if name == 'T':
+                expected -= 273.15
+            self.assertAlmostEqual(getattr(state, name), expected, delta=abs(expected) * 1e-7 + 1e-9, msg=name)
+
+    def test_pt(self):
+        for P, T in ((0.1, 20), (10, 300), (1, 200), (20, 370), (25, 400), (50, 700), (10, 1500)):
+            reference = IAPWS97(P=P, T=T + 273.15)
+            for mode in ('P-T-water', 'P-T-steam'):
+                with self.subTest(mode=mode, P=P, T=T):
+                    state = compute_state(mode, pressure=P, temperature=T)
+                    self.assertMatches(state, reference)
+                    self.assertAlmostEqual(state.mu / reference.mu, 1, delta=1e-7)
+                    self.assertAlmostEqual(state.cp / reference.cp, 1, delta=1e-7)
+
+    def test_ph(self):
+        for P, h in ((0.1, 100), (1, 2000), (10, 3000), (20, 1800), (25, 2100), (50, 3500)):
+            with self.subTest(P=P, h=h):
+                self.assertMatches(compute_state('P-H', pressure=P, enthalpy=h), IAPWS97(P=P, h=h))
+
+    def test_saturation(self):
+        for P in (0.001, 1, 10, 21):
+            state = compute_state('saturation-P', pressure=P)
+            with self.subTest(P=P):
+                self.assertMatches(state.water, IAPWS97(P=P, x=0), ('h', 's', 'v'))
+                self.assertMatches(state.steam, IAPWS97(P=P, x=1), ('h', 's', 'v'))
+        for T in (1, 100, 300, 370):
+            state = compute_state('saturation-T', temperature=T)
+            with self.subTest(T=T):
+                self.assertAlmostEqual(state.P, IAPWS97(T=T + 273.15, x=0).P, delta=1e-9)
+                self.assertMatches(state.water, IAPWS97(T=T + 273.15, x=0), ('h', 's', 'v'))
+                self.assertMatches(state.steam, IAPWS97(T=T + 273.15, x=1), ('h', 's', 'v'))
+
+    def test_fast_mode_error_bound(self):
+        # Границы из документации calculator.sbtl
+        deviation = sbtl.verify(1000, seed=3)
+        bounds = {
+            'P-T': {'h': 0.02, 's': 3e-5, 'v': 3e-5, 'mu': 2e-5},
+            'P-H': {'T': 0.004, 's': 4e-5, 'v': 3e-5, 'mu': 3e-5},
+        }
+        for mode, errors in bounds.items():
+            for name, bound in errors.items():
+                self.assertLess(deviation[mode][name], bound, msg=f'{mode} {name}')
+
+    def test_out_of_range(self):
+        with self.assertRaises(ValueError):
+            compute_state('saturation-P', pressure=30)
+        with self.assertRaises(ValueError):
+            compute_state('P-T-water', pressure=200, temperature=100)
+
+
+class SaturationTableTests(SimpleTestCase):
+    def test_error_bound(self):
+        deviation = saturation.verify(points=100, seed=1)
+        for name, value in deviation.items():
+            self.assertLess(value, saturation.ERROR_BOUND, msg=name)
+
+class RegionTests(SimpleTestCase):
+    def test_index_matches_bound_ph(self):
+        self.assertEqual(regions.verify(2000, seed=1), 0)
+
+    def test_saturation_line(self):
+        T = _TSat_P(10)
+        self.assertEqual(regions.classify_pt(10, T - 0.1), 1)
+        self.assertEqual(regions.classify_pt(10, T + 0.1), 2)
+
+    def test_b23(self):
+        T = _t_P(50)
+        self.assertEqual(regions.classify_pt(50, T - 0.5), 3)
+        self.assertEqual(regions.classify_pt(50, T + 0.5), 2)
+
+    def test_3a_3b(self):
+        h = _h_3ab(25)
+        self.assertEqual(regions.classify_ph(25, h - 5), 3)
+        self.assertEqual(compute_state('P-H', pressure=25, enthalpy=h - 5).region, '3a')
+        self.assertEqual(compute_state('P-H', pressure=25, enthalpy=h + 5).region, '3b')
+        # По (P, T) подобласть — по энтальпии рассчитанной точки
+        self.assertEqual(compute_state('P-T-steam', pressure=25, temperature=380).region, '3a')
+        self.assertEqual(compute_state('P-T-steam', pressure=25, temperature=390).region, '3b')
+
+class TableFileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tables.bin')
+        tablefile.build(self.path, ['saturation'])
+        self.addCleanup(tablefile.configure, tablefile._path)
+
+    def load_table(self):
+        # Таблица насыщения так, как её получает процесс при запуске
+        tablefile.configure(self.path)
+        with mock.patch.object(saturation, '_table', None):
+            return saturation.get_table()
+
+    def test_round_trip(self):
+        expected = saturation.build_arrays()
+        with self.assertLogs('calculator.tablefile', 'INFO'):
+            table = self.load_table()
+        for name, array in expected.items():
+            self.assertFalse(table.arrays[name].flags.writeable, msg=name)
+            np.testing.assert_array_equal(table.arrays[name], array)
+
+    def test_version_mismatch_falls_back_to_build(self):
+        with mock.patch.object(tablefile.iapws, '__version__', '0.0'):
+            with self.assertRaisesMessage(ValueError, 'iapws'):
+                tablefile.read(self.path)
+            with self.assertLogs('calculator.tablefile', 'WARNING'):
+                table = self.load_table()
+        self.assertIsNone(tablefile.section('saturation'))
+        self.assertTrue(table.arrays['T'].flags.writeable)
+        np.testing.assert_array_equal(table.rows, saturation.build_arrays()['rows'])
+
+    def test_corrupted_checksum(self):
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        with self.assertRaisesMessage(ValueError, 'контрольная сумма'):
+            tablefile.read(self.path)
+        tablefile.configure(self.path)
+        with self.assertLogs('calculator.tablefile', 'WARNING'):
+            self.assertIsNone(tablefile.section('saturation'))
+
+class StateCacheTests(SimpleTestCase):
+    def test_hit_and_miss(self):
+        cache = StateCache(maxsize=2)
+        state = cache.get_or_compute('P-T-water', pressure=1, temperature=100)
+        self.assertIs(cache.get_or_compute('P-T-water', pressure=1.0000000000001, temperature=100), state)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.get_or_compute('P-T-water', pressure=2, temperature=100)
+        cache.get_or_compute('P-T-water', pressure=3, temperature=100)
+        # Вытеснена самая старая запись
+        self.assertIsNone(cache.get('P-T-water', pressure=1, temperature=100))
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_fast_is_part_of_key(self):
+        cache = StateCache()
+        cache.get_or_compute('P-T-water', pressure=1, temperature=100)
+        self.assertIsNone(cache.get('P-T-water', True, pressure=1, temperature=100))
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_calls_share_one_computation(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 42
+
+        def call():
+            results.append(flight.do('key', compute))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=call) for _ in range(5)]
+        for thread in followers:
+            thread.start()
+        while flight.stats()['followers'] < 5:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [(42, False)] + [(42, True)] * 5)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_cancelled_leader_hands_over_to_follower(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(10 if len(calls) == 1 else 0.01)
+            return 42
+
+        async def scenario():
+            leader = asyncio.create_task(flight.ado('key', compute))
+            await asyncio.sleep(0)
+            followers = [asyncio.create_task(flight.ado('key', compute)) for _ in range(3)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*followers)
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(sorted(results), [(42, False), (42, True), (42, True)])
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_error_reaches_followers(self):
+        flight = SingleFlight()
+        with self.assertRaises(ZeroDivisionError):
+            flight.do('key', lambda: 1 / 0)
+        self.assertEqual(flight.do('key', lambda: 1), (1, False))
+
+
+class ParallelTests(SimpleTestCase):
+    def test_pool_keeps_order(self):
+        self.addCleanup(parallel.shutdown)
+        points = [('P-T-water', {'pressure': 1 + i / 10, 'temperature': 20 + i}) for i in range(40)]
+        points += [('P-H', {'pressure': 90, 'enthalpy': 4000}), ('saturation-T', {'temperature': 150})]
+        points += [('P-T-steam', {'pressure': 0.1 + i / 100, 'temperature': 200 + i}) for i in range(40)]
+        serial = parallel.compute_many(points, workers=1)
+        pooled = parallel.compute_many(points, workers=2, chunk_size=7)
+        self.assertEqual(len(pooled), len(points))
+        for index, ((state, error), (expected, expected_error)) in enumerate(zip(pooled, serial)):
+            with self.subTest(index=index):
+                self.assertEqual(error, expected_error)
+                if expected is not None:
+                    self.assertEqual(state.as_dict(), expected.as_dict())
+        self.assertIsNotNone(serial[40][1])
+
+class SweepTests(SimpleTestCase):
+    # Тёплый старт не должен менять результат: каждая точка — как у compute_state
+    def assertMatchesEngine(self, kind, fixed, start, stop, step):
+        mode, fixed_name, variable = sweep.SWEEPS[kind]
+        results = sweep.compute_sweep(kind, fixed, start, stop, step)
+        for value, (state, error) in zip(sweep.values(start, stop, step), results):
+            with self.subTest(kind=kind, value=value):
+                expected = compute_state(mode, **{fixed_name: fixed, variable: value})
+                self.assertIsNone(error)
+                self.assertEqual(state.region, expected.region)
+                self.assertAlmostEqual(state.h / expected.h, 1, delta=1e-9)
+                self.assertAlmostEqual(state.rho / expected.rho, 1, delta=1e-9)
+                self.assertEqual(state.x, expected.x)
+
+    def test_isobar_across_saturation_in_region_3(self):
+        self.assertMatchesEngine('isobar-T', 18, 340, 380, 1)
+        self.assertMatchesEngine('isobar-T', 21, 360, 380, 0.5)
+
+    def test_isotherm_across_saturation_in_region_3(self):
+        self.assertMatchesEngine('isotherm', 360, 17, 22, 0.05)
+
+    def test_isobar_by_enthalpy_across_dome(self):
+        self.assertMatchesEngine('isobar-H', 18, 1500, 2700, 20)
+
+
+class VectorizedTests(SimpleTestCase):
+    PRESSURES = (0.01, 0.1, 1, 5, 10, 15, 50)
+    # Однофазные точки — те же уравнения, что у engine; во влажном паре engine смешивает
+    # фазы по таблице насыщения, отличие — до 1e-8
+    TOLERANCE = 1e-12
+    WET_TOLERANCE = 1e-8
+
+    def assertMatchesEngine(self, evaluate, mode, name, values):
+        P, X = np.meshgrid(self.PRESSURES, values, indexing='ij')
+        columns = evaluate(P, X, transport=True, extended=True)
+        regions = set()
+        for index in np.ndindex(P.shape):
+            region = int(columns['region'][index])
+            if region == 0:
+                continue
+            state = compute_state(mode, pressure=P[index], **{name: X[index]})
+            regions.add(region)
+            with self.subTest(P=P[index], **{name: X[index]}):
+                self.assertEqual(str(region), state.region[0])
+                tolerance = self.WET_TOLERANCE if region == 4 else self.TOLERANCE
+                self.assertAlmostEqual(columns['T'][index], state.T, delta=(state.T + 273.15) * tolerance)
+                self.assertAlmostEqual(columns['x'][index], state.x, delta=tolerance)
+                for prop in ('h', 's', 'v', 'rho', 'mu') + EXTENDED_PROPERTIES:
+                    expected = getattr(state, prop)
+                    if expected is None:
+                        self.assertTrue(np.isnan(columns[prop][index]), prop)
+                    else:
+                        self.assertAlmostEqual(columns[prop][index] / expected, 1, delta=tolerance, msg=prop)
+        return regions
+
+    def test_pt(self):
+        regions = self.assertMatchesEngine(vectorized.evaluate_pt, 'P-T-water', 'temperature',
+                                           (20, 100, 150, 200, 250, 300, 400, 600, 800))
+        self.assertEqual(regions, {1, 2})
+
+    def test_ph(self):
+        regions = self.assertMatchesEngine(vectorized.evaluate_ph, 'P-H', 'enthalpy',
+                                           (100, 500, 1000, 1500, 2000, 2500, 2700, 3000, 3500))
+        self.assertEqual(regions, {1, 2, 4})
+
+    def test_outside_regions(self):
+        columns = vectorized.evaluate_pt(np.array([25.0, 50.0]), np.array([380.0, 1000.0]))
+        self.assertEqual(columns['region'].tolist(), [0, 0])
+        self.assertTrue(np.isnan(columns['h']).all())
+
+
+class GridApiTests(TestCase):
+    def _post(self, **payload):
+        return self.client.post('/calculator/api/grid/', {'param_type': 'P-T', **payload},
+                                content_type='application/json')
+
+    def test_size_is_checked_before_axes_are_built(self):
+        with mock.patch('numpy.linspace', side_effect=AssertionError) as linspace:
+            for num in (10 ** 10, 1e300):
+                response = self._post(pressure={'start': 0.1, 'stop': 30, 'num': num}, temperature=[100, 200])
+                self.assertEqual(response.status_code, 400)
+            linspace.assert_not_called()
+        self.assertEqual(self._post(pressure={'start': 0.1, 'stop': 30, 'num': 'Infinity'},
+                                    temperature=[100]).status_code, 400)
+
+    def test_scalar_fallback_is_capped(self):
+        # Область 3: 20–30 МПа, 360–400 °C
+        payload = {'pressure': {'start': 20, 'stop': 30, 'num': 5}, 'temperature': {'start': 360, 'stop': 400, 'num': 5}}
+        with mock.patch.object(views, 'GRID_MAX_SCALAR_POINTS', 10):
+            response = self._post(**payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('вне областей 1, 2 и 4', response.json()['error'])
+        response = self._post(**payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(3, response.json()['columns']['region'])
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        get_state_cache().clear()
+        self.addCleanup(parallel.shutdown)
+
+    async def test_calculation(self):
+        response = await self.async_client.post('/calculator/async/', {
+            'mode': 'full', 'param_type': 'P-T-water', 'pressure': '2', 'temperature': '150',
+        })
+        self.assertEqual(response.status_code, 200)
+        state = response.context['result']
+        self.assertAlmostEqual(state.h, compute_state('P-T-water', pressure=2, temperature=150).h)
+
+    async def test_busy_server_returns_503(self):
+        # Все слоты заняты: расчёт не запускается, клиенту — 503 с Retry-After
+        with mock.patch.object(views, '_in_flight', threading.BoundedSemaphore(1)) as slots, \
+                mock.patch('calculator.parallel.get_pool', side_effect=AssertionError):
+            slots.acquire()
+            response = await self.async_client.post('/calculator/async/', {
+                'mode': 'full', 'param_type': 'P-T-water', 'pressure': '3', 'temperature': '150',
+            })
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(views.ASYNC_DEFAULTS['RETRY_AFTER']))
+
+
+class ResultUrlTests(TestCase):
+    CANONICAL = '/calculator/result/?mode=full&param_type=P-H&pressure=1&enthalpy=3000'
+
+    def test_non_canonical_query_redirects(self):
+        for query in ('param_type=P-H&mode=full&pressure=1.0&enthalpy=3000',
+                      'mode=full&param_type=P-H&pressure=1&enthalpy=3000.000&temperature=5'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/calculator/result/?{query}')
+                self.assertEqual(response.status_code, 301)
+                self.assertEqual(response['Location'], self.CANONICAL)
+                self.assertNotIn('ETag', response)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.CANONICAL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        again = self.client.get(self.CANONICAL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], response['ETag'])
+        other = self.client.get(self.CANONICAL, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(other.status_code, 200)
+
+    def test_cache_control(self):
+        response = self.client.get(self.CANONICAL)
+        self.assertEqual(response['Cache-Control'], views.RESULT_CACHE_CONTROL)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        # Ошибка расчёта — тоже 200, но без долгого кэширования
+        error = self.client.get('/calculator/result/?mode=full&param_type=P-H&pressure=90&enthalpy=4000')
+        self.assertEqual(error.status_code, 200)
+        self.assertIsNotNone(error.context['error'])
+        self.assertEqual(error['Cache-Control'], views.RESULT_ERROR_CACHE_CONTROL)
+        invalid = self.client.get('/calculator/result/?mode=full&param_type=P-H&pressure=abc')
+        self.assertNotIn('Cache-Control', invalid)
+
+    def test_etag_depends_on_calculation_settings(self):
+        etag = self.client.get(self.CANONICAL)['ETag']
+        with override_settings(CALCULATOR_FAST_MODE=not settings.CALCULATOR_FAST_MODE):
+            self.assertNotEqual(self.client.get(self.CANONICAL)['ETag'], etag)
+        with mock.patch.object(views, 'RESULT_VERSION', 'test'):
+            self.assertNotEqual(self.client.get(self.CANONICAL)['ETag'], etag)
+
+    def test_invalid_query(self):
+        response = self.client.get('/calculator/result/?mode=full&param_type=P-H&pressure=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response)
+
+
+class SweepApiTests(TestCase):
+    def _post(self, **payload):
+        return self.client.post('/calculator/api/sweep/', {'sweep': 'isobar-T', 'pressure': 1, **payload},
+                                content_type='application/json')
+
+    def test_tiny_step_is_rejected_before_building_values(self):
+        with mock.patch('calculator.sweep.values', side_effect=AssertionError) as values:
+            response = self._post(start=0, stop=100, step=1e-9)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(views.SWEEP_MAX_POINTS), response.json()['error'])
+        values.assert_not_called()
+
+    def test_invalid_range(self):
+        for payload in ({'start': 0, 'stop': 100, 'step': 0}, {'start': 100, 'stop': 0, 'step': 1},
+                        {'start': 0, 'stop': 'Infinity', 'step': 1}):
+            with self.subTest(**payload):
+                self.assertEqual(self._post(**payload).status_code, 400)
+
+    def test_points(self):
+        response = self._post(start=50, stop=300, step=50, properties=['h'])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 6)
+        self.assertEqual(results[0]['result']['h'], compute_state('P-T-water', pressure=1, temperature=50).h)
+
+
+class FastFlagTests(TestCase):
+    POINT = {'mode': 'full', 'param_type': 'P-T-water', 'pressure': 1, 'temperature': 100}
+    SWEEP = {'sweep': 'isobar-T', 'pressure': 1, 'start': 50, 'stop': 100, 'step': 50}
+
+    def _batch(self, fast):
+        return self.client.post('/calculator/api/batch/', {'points': [self.POINT], 'fast': fast},
+                                content_type='application/json')
+
+    def _sweep(self, fast):
+        return self.client.post('/calculator/api/sweep/', {**self.SWEEP, 'fast': fast},
+                                content_type='application/json')
+
+    @override_settings(CALCULATOR_FAST_MODE=True)
+    def test_strings_are_parsed_like_csv(self):
+        for value, expected in ((False, False), ('false', False), ('0', False), (True, True), ('1', True)):
+            with self.subTest(value=value):
+                with mock.patch('calculator.views._resolve', wraps=views._resolve) as resolve:
+                    self.assertEqual(self._batch(value).status_code, 200)
+                self.assertIs(resolve.call_args.args[1], expected)
+                with mock.patch('calculator.sweep.compute_sweep', wraps=sweep.compute_sweep) as compute:
+                    self.assertEqual(self._sweep(value).status_code, 200)
+                self.assertIs(compute.call_args.args[5], expected)
+
+    def test_other_values_are_rejected(self):
+        for value in (0, 1, 'yes', 'False', [], {}):
+            with self.subTest(value=value):
+                self.assertEqual(self._batch(value).status_code, 400)
+                self.assertEqual(self._sweep(value).status_code, 400)
+        response = self.client.post('/calculator/csv/?fast=yes', 'mode\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+
+class BatchApiTests(TestCase):
+    def _post(self, points):
+        return self.client.post('/calculator/api/batch/', points, content_type='application/json')
+
+    def test_order_and_inline_errors(self):
+        temperatures = [300, 20, 150, 80]
+        points = [{'mode': 'full', 'param_type': 'P-T-water', 'pressure': 5, 'temperature': t} for t in temperatures]
+        points.insert(2, {'mode': 'full', 'param_type': 'P-T-water', 'pressure': 5})
+        points.insert(4, 'точка')
+        points.append({'mode': 'full', 'param_type': 'P-H', 'pressure': 90, 'enthalpy': 4000})
+        response = self._post(points)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), len(points))
+        # Ошибки формы — по полям, как form.errors.get_json_data()
+        self.assertIsInstance(results[2]['error'], dict)
+        self.assertEqual(results[4]['error'], 'Точка должна быть объектом.')
+        self.assertIn('Ошибка в расчётах', results[-1]['error'])
+        valid = [item for index, item in enumerate(results) if index not in (2, 4, len(results) - 1)]
+        for temperature, item in zip(temperatures, valid):
+            with self.subTest(temperature=temperature):
+                expected = compute_state('P-T-water', pressure=5, temperature=temperature)
+                self.assertEqual(item['result']['h'], expected.h)
+
+    def test_max_points(self):
+        point = {'mode': 'saturation', 'calc_by': 'P', 'pressure': 1}
+        with mock.patch.object(views, 'BATCH_MAX_POINTS', 3):
+            self.assertEqual(self._post([point] * 3).status_code, 200)
+            response = self._post({'points': [point] * 4})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('3', response.json()['error'])
+
+    def test_not_a_list(self):
+        self.assertEqual(self._post({'point': {}}).status_code, 400)
+        response = self.client.post('/calculator/api/batch/', '[', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+class PropertySelectionTests(TestCase):
+    POINTS = [
+        {'mode': 'full', 'param_type': 'P-T-water', 'pressure': 1, 'temperature': 100},
+        {'mode': 'saturation', 'calc_by': 'T', 'temperature': 150},
+    ]
+
+    def setUp(self):
+        get_state_cache().clear()
+
+    def _batch(self, properties, **extra):
+        return self.client.post('/calculator/api/batch/', {'points': self.POINTS, 'properties': properties},
+                                content_type='application/json', **extra)
+
+    def test_only_selected_properties(self):
+        with mock.patch('calculator.engine._Viscosity') as viscosity:
+            response = self._batch(['rho', 'h'])
+        self.assertEqual(response.status_code, 200)
+        state, saturated = (item['result'] for item in response.json()['results'])
+        self.assertEqual(list(state), ['h', 'rho', 'region', 'path'])
+        self.assertEqual(state['h'], compute_state('P-T-water', pressure=1, temperature=100).h)
+        self.assertEqual(set(saturated), {'water', 'steam', 'region', 'path'})
+        self.assertEqual(list(saturated['water']), ['h', 'rho'])
+        # Вязкость не выбрана — и не считается
+        viscosity.assert_not_called()
+
+    def test_csv_columns(self):
+        response = self._batch(['h'], HTTP_ACCEPT='text/csv')
+        header = response.content.decode().splitlines()[0].split(',')
+        self.assertIn('h', header)
+        self.assertNotIn('rho', header)
+        self.assertNotIn('mu', header)
+
+    def test_unknown_property(self):
+        for properties in (['h', 'enthalpy'], 'h', [1]):
+            with self.subTest(properties=properties):
+                response = self._batch(properties)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('properties', response.json()['error'])
+        response = self.client.post('/calculator/api/sweep/', {
+            'sweep': 'isobar-T', 'pressure': 1, 'start': 50, 'stop': 100, 'step': 50, 'properties': ['hh'],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/calculator/api/grid/', {
+            'param_type': 'P-T', 'pressure': [1], 'temperature': [100], 'properties': ['hh'],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+class HistoryTests(TestCase):
+    def test_record_keeps_lazy_properties_lazy(self):
+        state = compute_state('P-T-water', pressure=10, temperature=300)
+        history.record_many([('P-T-water', {'pressure': 10, 'temperature': 300}, False, state)])
+        self.assertIsNone(state.viscosity)
+        self.assertIsNone(state.extended_values)
+        result = CalculationRecord.objects.get().result
+        self.assertEqual(set(result), {'P', 'T', 'h', 's', 'v', 'x', 'region', 'path'})
+
+    def test_restored_state_matches_engine(self):
+        for mode, inputs in (
+            ('P-T-water', {'pressure': 10, 'temperature': 300}),
+            ('P-T-steam', {'pressure': 20, 'temperature': 380}),
+            ('P-H', {'pressure': 1, 'enthalpy': 2000}),
+            ('saturation-P', {'pressure': 1}),
+        ):
+            with self.subTest(mode=mode):
+                expected = compute_state(mode, **inputs)
+                history.record_many([(mode, inputs, False, compute_state(mode, **inputs))])
+                key = history.key_of(mode, inputs)
+                restored = history.lookup_many([key])[key]
+                for name, value in expected.as_dict().items():
+                    if isinstance(value, dict):
+                        for phase_name, phase_value in value.items():
+                            self.assertAlmostEqual(restored.as_dict()[name][phase_name], phase_value, places=9)
+                    elif isinstance(value, float):
+                        self.assertAlmostEqual(getattr(restored, name) / value, 1, places=9)
+                    else:
+                        self.assertEqual(getattr(restored, name), value)
+                if mode != 'saturation-P' and expected.x in (0, 1):
+                    self.assertTrue(all(getattr(restored, name) is not None for name in EXTENDED_PROPERTIES))
+
+    def test_records_of_other_versions_are_ignored(self):
+        state = compute_state('P-T-water', pressure=10, temperature=300)
+        key = history.key_of('P-T-water', {'pressure': 10, 'temperature': 300})
+        self.assertTrue(key.startswith(f'iapws-{iapws.__version__}:r{history.RESULT_VERSION}:'))
+        CalculationRecord.objects.create(
+            key=key.replace(history.VERSION, 'iapws-0.0:r1'), mode='P-T-water', result=state.as_dict(),
+        )
+        self.assertEqual(history.lookup_many([key]), {})
+        history.record_many([('P-T-water', {'pressure': 10, 'temperature': 300}, False, state)])
+        self.assertEqual(history.lookup_many([key])[key].h, state.h)
+
+
+class CycleTests(SimpleTestCase):
+    # Çengel, Boles. Thermodynamics, примеры 10-1 и 10-4
+    def test_simple_ideal_cycle(self):
+        result = cycle.solve(3, 350, 0.075)
+        self.assertAlmostEqual(result.pump_work, 3.03, delta=0.01)
+        self.assertAlmostEqual(result.turbine_work, 713.1, delta=0.5)
+        self.assertAlmostEqual(result.heat_in, 2728.6, delta=0.5)
+        self.assertAlmostEqual(result.efficiency, 0.260, delta=0.001)
+        self.assertAlmostEqual(result.points[-1].state.x, 0.886, delta=0.001)
+
+    def test_reheat_cycle(self):
+        result = cycle.solve(15, 600, 0.01, reheat_pressure=4, reheat_temperature=600)
+        states = {point.name: point.state for point in result.points}
+        self.assertAlmostEqual(states['3'].h, 3583.1, delta=0.5)
+        self.assertAlmostEqual(states['5'].h, 3674.9, delta=0.5)
+        self.assertAlmostEqual(states['6'].x, 0.896, delta=0.001)
+        self.assertAlmostEqual(result.efficiency, 0.450, delta=0.001)
+
+    def test_turbine_efficiency_lowers_cycle_efficiency(self):
+        ideal = cycle.solve(10, 500, 0.01)
+        real = cycle.solve(10, 500, 0.01, turbine_efficiency=0.85, pump_efficiency=0.8)
+        self.assertAlmostEqual(real.turbine_work / ideal.turbine_work, 0.85, delta=1e-9)
+        self.assertLess(real.efficiency, ideal.efficiency)
+
+
+class ColumnarTests(TestCase):
+    def test_round_trip(self):
+        results = [
+            (compute_state('P-T-water', pressure=1, temperature=100), None),
+            (compute_state('P-H', pressure=1, enthalpy=2000), None),
+            (None, 'Давление вне диапазона'),
+        ]
+        columns = columnar.from_results(results, inputs={'pressure': np.array([1.0, 1.0, 300.0])})
+        data = columnar.dumps(columns)
+        arrays = columnar.load(data)
+        self.assertEqual(arrays['h'][1], results[1][0].h)
+        self.assertTrue(np.isnan(arrays['h'][2]))
+        self.assertEqual(arrays['region'].tolist(), [1, 4, 0])
+        self.assertEqual(arrays['phase'].tolist(), [0, 2, -1])
+        self.assertEqual(arrays['error'].tolist(), ['', '', 'Давление вне диапазона'])
+        # Столбцы — представления буфера без копирования, выровненные по ALIGN
+        self.assertFalse(arrays['h'].flags.owndata)
+        start = np.frombuffer(data, np.uint8).ctypes.data
+        self.assertEqual((arrays['h'].ctypes.data - start) % columnar.ALIGN, 0)
+        # Архив читается и обычным np.load
+        with np.load(io.BytesIO(data)) as npz:
+            for name, array in columns.items():
+                np.testing.assert_array_equal(npz[name], array)
+
+    def test_batch_response(self):
+        response = self.client.post('/calculator/api/batch/', [
+            {'mode': 'full', 'param_type': 'P-T-water', 'pressure': 1, 'temperature': 100},
+        ], content_type='application/json', HTTP_ACCEPT=columnar.MEDIA_TYPE)
+        self.assertEqual(response['Content-Type'], columnar.MEDIA_TYPE)
+        self.assertIn('Accept', response['Vary'])
+        arrays = columnar.load(response.content)
+        self.assertAlmostEqual(arrays['h'][0], compute_state('P-T-water', pressure=1, temperature=100).h)
+
+
+@override_settings(CALCULATOR_STEAM_TABLES_DIR=None)
+class SteamTableTests(SimpleTestCase):
+    def test_gzip(self):
+        plain = self.client.get('/calculator/tables/saturation-T/')
+        compressed = self.client.get('/calculator/tables/saturation-T/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(plain['ETag'], compressed['ETag'])
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+
+    def test_gzip_weights(self):
+        for accept, compressed in (
+            ('gzip;q=0', False),
+            ('gzip;q=0.0, br', False),
+            ('br, GZIP;q=0.5', True),
+            ('*', True),
+            ('*;q=0.1, gzip;q=0', False),
+            ('gzip;q=abc', False),
+            ('identity', False),
+            ('', False),
+        ):
+            with self.subTest(accept=accept):
+                response = self.client.get('/calculator/tables/saturation-T/', HTTP_ACCEPT_ENCODING=accept)
+                self.assertEqual(response.get('Content-Encoding') == 'gzip', compressed)
+
+    def test_not_modified(self):
+        response = self.client.get('/calculator/tables/saturation-P/csv/')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        again = self.client.get('/calculator/tables/saturation-P/csv/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(again['Cache-Control'], views.STEAM_TABLE_CACHE_CONTROL)
+        self.assertIn('Accept-Encoding', again['Vary'])
+        self.assertEqual(again['ETag'], response['ETag'])
+
+    def test_rows_match_engine(self):
+        row = steamtables.get('saturation-T', 'csv').content.decode().splitlines()[21].split(',')
+        state = compute_state('saturation-T', temperature=100)
+        self.assertEqual(float(row[0]), 100)
+        self.assertAlmostEqual(float(row[4]), state.water.h)
+
+    def test_superheated_rows_are_vapour_like(self):
+        rows = steamtables._superheated_rows()
+        self.assertTrue(all(row['x'] == 1 for row in rows))
+        supercritical = [row for row in rows if row['P'] >= 22.064]
+        self.assertEqual(min(row['T'] for row in supercritical if row['P'] == 50), 500)
+        for row in supercritical:
+            self.assertGreater(row['T'], steamtables.pseudocritical_temperature(row['P']))
+        self.assertAlmostEqual(steamtables.pseudocritical_temperature(25), 384.9, delta=0.1)
+
+    def test_unknown_table(self):
+        self.assertEqual(self.client.get('/calculator/tables/unknown/').status_code, 404)
+
+
+class ServerTimingTests(TestCase):
+    def test_header(self):
+        response = self.client.get('/calculator/result/', {
+            'mode': 'full', 'param_type': 'P-H', 'pressure': 1, 'enthalpy': 3000,
+        })
+        self.assertEqual(response.status_code, 200)
+        stages = [item.split(';')[0] for item in response['Server-Timing'].split(', ')]
+        self.assertEqual(stages[-1], 'total')
+        self.assertTrue({'validate', 'solve', 'render'} <= set(stages))
+        metrics = self.client.get('/calculator/metrics/').content.decode()
+        self.assertIn('wasp_calculator_stage_seconds_count{mode="P-H",stage="solve"}', metrics)
+
+    @override_settings(CALCULATOR_SERVER_TIMING=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/calculator/tables/saturation-T/'))
+
+
+class PipeTests(SimpleTestCase):
+    CASES = (
+        {'pressure': 1, 'temperature': 250, 'mass_flow': 10, 'length': 1000, 'diameter': 300, 'segments': 200},
+        {'pressure': 1, 'temperature': 250, 'mass_flow': 10, 'length': 1000, 'diameter': 300, 'segments': 200,
+         'heat_flux': -2},
+        {'pressure': 5, 'temperature': 200, 'mass_flow': 2, 'length': 200, 'diameter': 50, 'heat_flux': 100},
+        {'pressure': 25, 'temperature': 380, 'mass_flow': 5, 'length': 500, 'diameter': 80, 'heat_flux': 20,
+         'elevation': 50},
+        {'pressure': 0.64, 'temperature': 659, 'mass_flow': 3.8, 'length': 13, 'diameter': 100, 'elevation': -19,
+         'segments': 50},
+        {'pressure': 1.8, 'enthalpy': 151, 'mass_flow': 0.22, 'length': 81, 'diameter': 25, 'heat_flux': -2,
+         'segments': 50},
+    )
+
+    def test_reuse_error_bound(self):
+        # Граница из документации calculator.pipe
+        for case in self.CASES:
+            reused, exact = pipe.solve(**case), pipe.solve(**case, reuse=False)
+            with self.subTest(**case):
+                self.assertGreater(reused.reused, 0)
+                for node, expected in zip(reused.nodes, exact.nodes):
+                    state, reference = node.state, expected.state
+                    self.assertLess(abs(state.P / reference.P - 1), 5e-5)
+                    self.assertLess(abs(state.rho / reference.rho - 1), 5e-5)
+                    self.assertLess(abs(state.T - reference.T) / (reference.T + 273.15), 1e-5)
+                    self.assertLess(abs(state.h / reference.h - 1), 1e-5)
+                    self.assertLess(abs(node.viscosity / expected.viscosity - 1), 1e-5)
+
+    def test_steam_line(self):
+        flow = pipe.solve(**self.CASES[0])
+        self.assertEqual(len(flow.nodes), 201)
+        self.assertGreater(flow.pressure_drop, 0)
+        self.assertEqual(flow.outlet.x, 1)
+        self.assertLess(flow.evaluations, flow.reused)
+
+
+class CsvStreamTests(TestCase):
+    ROWS = 'mode,param_type,pressure,temperature\n' + ''.join(
+        f'full,P-T-water,{1 + i / 100},{100 + i % 50}\n' for i in range(200)
+    )
+
+    def _stream(self):
+        response = self.client.post('/calculator/csv/', self.ROWS, content_type='text/csv')
+        return iter(response.streaming_content)
+
+    @override_settings(CALCULATOR_PARALLEL={'WORKERS': 2, 'CHUNK_SIZE': 16})
+    def test_first_rows_do_not_wait_for_pool(self):
+        self.addCleanup(parallel.shutdown)
+        warming = Future()
+        with mock.patch('calculator.parallel.start_pool', return_value=warming) as start, \
+                mock.patch('calculator.parallel.compute_many', wraps=parallel.compute_many) as pooled:
+            content = self._stream()
+            next(content)
+            first = next(content)
+            self.assertEqual(pooled.call_count, 0)
+            start.assert_called_once()
+            for _ in range(views.CSV_SERIAL_WINDOW - 1):
+                next(content)
+            # Пул готов — остальные строки идут окнами по порции на воркер
+            warming.set_result(None)
+            rest = list(content)
+        self.assertEqual(len(rest), 200 - views.CSV_SERIAL_WINDOW)
+        # 136 строк окнами по 2 × 16
+        self.assertEqual(pooled.call_count, 5)
+        expected = compute_state('P-T-water', pressure=1, temperature=100)
+        self.assertAlmostEqual(float(first.decode().split(',')[4 + views.CSV_COLUMNS.index('h')]), expected.h)
+
+    @override_settings(CALCULATOR_PARALLEL={'WORKERS': 2})
+    def test_small_file_does_not_start_pool(self):
+        self.ROWS = self.ROWS[:self.ROWS.index('\n', 200)]
+        with mock.patch('calculator.parallel.start_pool') as start:
+            list(self._stream())
+        start.assert_not_called()
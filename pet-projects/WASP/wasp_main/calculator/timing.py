@@ -0,0 +1,154 @@
+"""Замер этапов обработки запросов: заголовок Server-Timing и гистограммы.
+
+ServerTimingMiddleware открывает замер на каждый запрос. Представления
+отмечают этапы контекстным менеджером stage(): 'validate' (проверка формы,
+в том числе WaterPropertiesForm.clean), 'solve' (расчёт), 'render'
+(шаблон); повторный этап с тем же именем прибавляется к первому. Режим
+расчёта задаёт set_mode(), без него режим — имя маршрута (calculate_batch,
+steam_table, ...).
+
+Ответ получает заголовок Server-Timing с этапами и total в миллисекундах
+(settings.CALCULATOR_SERVER_TIMING = False — без заголовка). Длительности
+копятся в гистограммах процесса по (режим, этап) с границами BUCKETS;
+metrics() отдаёт их в текстовом формате Prometheus. У каждого воркера свои
+гистограммы. Для потоковых ответов total — время до начала передачи тела.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Верхние границы корзин гистограмм, с
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC = 'wasp_calculator_stage_seconds'
+
+_current = contextvars.ContextVar('calculator_timings', default=None)
+_lock = threading.Lock()
+_histograms = {}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        # Последняя корзина — значения больше всех границ
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class _Timings:
+    __slots__ = ('mode', 'stages')
+
+    def __init__(self):
+        self.mode = None
+        self.stages = {}
+
+
+@contextmanager
+def stage(name):
+    """Замерить этап name текущего запроса; вне запроса ничего не делает."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.stages[name] = timings.stages.get(name, 0.0) + time.perf_counter() - started
+
+
+def set_mode(mode):
+    """Режим расчёта текущего запроса — метка его гистограмм."""
+    timings = _current.get()
+    if timings is not None:
+        timings.mode = mode
+
+
+def observe(mode, name, seconds):
+    with _lock:
+        histogram = _histograms.get((mode, name))
+        if histogram is None:
+            histogram = _histograms[(mode, name)] = Histogram()
+        histogram.observe(seconds)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metrics():
+    """Гистограммы процесса в текстовом формате Prometheus."""
+    lines = [
+        f'# HELP {METRIC} Длительность этапов обработки запросов калькулятора по режимам.',
+        f'# TYPE {METRIC} histogram',
+    ]
+    with _lock:
+        histograms = [(key, list(h.counts), h.sum, h.count) for key, h in sorted(_histograms.items())]
+    for (mode, name), counts, total, count in histograms:
+        labels = f'mode="{_label(mode)}",stage="{_label(name)}"'
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS + ('+Inf',), counts):
+            cumulative += bucket
+            lines.append(f'{METRIC}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC}_sum{{{labels}}} {total!r}')
+        lines.append(f'{METRIC}_count{{{labels}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = _Timings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timings = _Timings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, total):
+        match = request.resolver_match
+        mode = timings.mode or (match.url_name if match is not None else None) or 'other'
+        stages = {**timings.stages, 'total': total}
+        for name, seconds in stages.items():
+            observe(mode, name, seconds)
+        if getattr(settings, 'CALCULATOR_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={seconds * 1000:.3f}' for name, seconds in stages.items()
+            )
+        return response
@@ -3,4 +3,18 @@ from . import views
 
 urlpatterns = [
     path('', views.calculate_properties, name='calculate'),
+    path('result/', views.calculation_result, name='calculate_result'),
+    path('async/', views.calculate_properties_async, name='calculate_async'),
+    path('api/batch/', views.calculate_batch, name='calculate_batch'),
+    path('csv/', views.calculate_csv, name='calculate_csv'),
+    path('api/grid/', views.calculate_grid, name='calculate_grid'),
+    path('api/sweep/', views.calculate_sweep, name='calculate_sweep'),
+    path('cycle/', views.calculate_cycle, name='calculate_cycle'),
+    path('api/cycle/', views.calculate_cycle_api, name='calculate_cycle_api'),
+    path('pipe/', views.calculate_pipe, name='calculate_pipe'),
+    path('api/pipe/', views.calculate_pipe_api, name='calculate_pipe_api'),
+    path('tables/<slug:name>/', views.steam_table, name='steam_table'),
+    path('tables/<slug:name>/csv/', views.steam_table, {'fmt': 'csv'}, name='steam_table_csv'),
+    path('api/stats/', views.calculator_stats, name='calculator_stats'),
+    path('metrics/', views.calculator_metrics, name='calculator_metrics'),
 ]
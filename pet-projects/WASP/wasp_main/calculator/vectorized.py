@@ -0,0 +1,333 @@
+"""Векторный расчёт IAPWS-IF97 для областей 1, 2 и 4 на массивах NumPy.
+
+evaluate_pt(P, T) и evaluate_ph(P, h) принимают массивы (или числа) давления
+[МПа] и температуры [°C] / энтальпии [кДж/кг] и за один проход возвращают
+словарь массивов T, h, s, v, rho, x, mu, nu и region, а с extended=True —
+и расширенные свойства engine.EXTENDED_PROPERTIES. С transport=False
+вязкость не считается и mu, nu (и k, Prandt) остаются NaN. Уравнения и
+коэффициенты те же, что у IAPWS97 (коэффициенты берутся из iapws), поэтому
+результаты совпадают со скалярным расчётом calculator.engine до округления.
+
+Точки вне областей 1, 2 и 4 (области 3, 5, вне диапазона) получают region 0
+и NaN во всех свойствах — их нужно досчитать скалярно. В двухфазной области,
+как и в IAPWS97, вязкость и расширенные свойства не определены (NaN).
+"""
+import numpy as np
+from iapws import _iapws97Constants as Const
+from iapws._iapws import Pc, R, Tc, rhoc
+from iapws.iapws97 import Pmin, Ps_623
+
+TMIN = 273.15
+TMAX = 1073.15
+PMAX = 100.0
+# Размер порции: промежуточные массивы (порция × число членов) остаются небольшими
+CHUNK = 8192
+
+_SAT_N = (0, 0.11670521452767E+04, -0.72421316703206E+06, -0.17073846940092E+02,
+          0.12020824702470E+05, -0.32325550322333E+07, 0.14915108613530E+02,
+          -0.48232657361591E+04, 0.40511340542057E+06, -0.23855557567849E+00,
+          0.65017534844798E+03)
+
+_VISCOSITY_H = (1.67752, 2.20462, 0.6366564, -0.241605)
+_VISCOSITY_HIJ = np.zeros((6, 7))
+for _i, _j, _h in zip(
+        (0, 1, 2, 3, 0, 1, 2, 3, 5, 0, 1, 2, 3, 4, 0, 1, 0, 3, 4, 3, 5),
+        (0, 0, 0, 0, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 4, 4, 5, 6, 6),
+        (0.520094, 0.850895e-1, -0.108374e1, -0.289555, 0.222531, 0.999115,
+         0.188797e1, 0.126613e1, 0.120573, -0.281378, -0.906851, -0.772479,
+         -0.489837, -0.257040, 0.161913, 0.257399, -0.325372e-1, 0.698452e-1,
+         0.872102e-2, -0.435673e-2, -0.593264e-3)):
+    _VISCOSITY_HIJ[_i, _j] = _h
+
+# Теплопроводность IAPWS 2011 с промышленной формулировкой критического усиления, как в IAPWS97
+_CONDUCTIVITY_N = (2.443221e-3, 1.323095e-2, 6.770357e-3, -3.454586e-3, 4.096266e-4)
+_CONDUCTIVITY_NIJ = np.array((
+    (1.60397357, -0.646013523, 0.111443906, 0.102997357, -0.0504123634, 0.00609859258),
+    (2.33771842, -2.78843778, 1.53616167, -0.463045512, 0.0832827019, -0.00719201245),
+    (2.19650529, -4.54580785, 3.55777244, -1.40944978, 0.275418278, -0.0205938816),
+    (-1.21051378, 1.60812989, -0.621178141, 0.0716373224, 0, 0),
+    (-2.7203370, 4.57586331, -3.18369245, 1.1168348, -0.19268305, 0.012913842),
+))
+# Верхние границы приведённой плотности и коэффициенты (drho/dP)_T на них
+_CONDUCTIVITY_D = (0.310559006, 0.776397516, 1.242236025, 1.863354037)
+_CONDUCTIVITY_A = np.array((
+    (6.53786807199516, -5.61149954923348, 3.39624167361325, -2.27492629730878, 10.2631854662709, 1.97815050331519),
+    (6.52717759281799, -6.30816983387575, 8.08379285492595, -9.82240510197603, 12.1358413791395, -5.54349664571295),
+    (5.35500529896124, -3.96415689925446, 8.91990208918795, -12.0338729505790, 9.19494865194302, -2.16866274479712),
+    (1.55225959906681, 0.464621290821181, 8.93237374861479, -11.0321960061126, 6.16780999933360, -0.965458722086812),
+    (1.11999926419994, 0.595748562571649, 9.88952565078920, -10.3255051147040, 4.66861294457414, -0.503243546373828),
+))
+_RG = 0.46151805
+# Свойства уравнения области, из которых считаются расширенные
+_DERIVATIVES = ('cp', 'cv', 'w', 'alfav', 'kt')
+
+
+def _tsat(P):
+    # IF97, ур. 31
+    n = _SAT_N
+    beta = P ** 0.25
+    E = beta ** 2 + n[3] * beta + n[6]
+    F = n[1] * beta ** 2 + n[4] * beta + n[7]
+    G = n[2] * beta ** 2 + n[5] * beta + n[8]
+    D = 2 * G / (-F - np.sqrt(F ** 2 - 4 * E * G))
+    return (n[10] + D - np.sqrt((n[10] + D) ** 2 - 4 * (n[9] + n[10] * D))) / 2
+
+
+def _t_b23(P):
+    # Граница областей 2 и 3, IF97, ур. 6
+    return 0.57254459862746e3 + np.sqrt((P - 0.1391883977870e2) / 0.10192970039326e-2)
+
+
+def _region1(T, P, derivatives=False):
+    Tr = (1386 / T)[:, None]
+    Pr = (P / 16.53)[:, None]
+    n, Li, Lj = Const.Region1_n, Const.Region1_Li, Const.Region1_Lj
+    pi = (7.1 - Pr) ** Li
+    tau = (Tr - 1.222) ** Lj
+    g = np.sum(n * pi * tau, axis=1)
+    gp = -np.sum(n * Li * pi / (7.1 - Pr) * tau, axis=1)
+    gt = np.sum(n * Lj * pi * tau / (Tr - 1.222), axis=1)
+    gtt = np.sum(n * Lj * (Lj - 1) * pi * tau / (Tr - 1.222) ** 2, axis=1)
+    if derivatives:
+        gpp = np.sum(n * Li * (Li - 1) * pi / (7.1 - Pr) ** 2 * tau, axis=1)
+        gpt = -np.sum(n * Li * Lj * pi / (7.1 - Pr) * tau / (Tr - 1.222), axis=1)
+    Tr, Pr = Tr[:, 0], Pr[:, 0]
+    props = {
+        'v': Pr * gp * R * T / P / 1000,
+        'h': Tr * gt * R * T,
+        's': R * (Tr * gt - g),
+        'cp': -R * Tr ** 2 * gtt,
+    }
+    if derivatives:
+        props.update({
+            'cv': R * (-Tr ** 2 * gtt + (gp - Tr * gpt) ** 2 / gpp),
+            'w': np.sqrt(R * T * 1000 * gp ** 2 / ((gp - Tr * gpt) ** 2 / (Tr ** 2 * gtt) - gpp)),
+            'alfav': (1 - Tr * gpt / gp) / T,
+            'kt': -Pr * gpp / gp / P,
+        })
+    return props
+
+
+def _region2(T, P, derivatives=False):
+    Tr = (540 / T)[:, None]
+    Pr = P[:, None]
+    no, Jo = Const.Region2_cp0_no, Const.Region2_cp0_Jo
+    go = np.log(Pr[:, 0]) + np.sum(no * Tr ** Jo, axis=1)
+    got = np.sum(no * Jo * Tr ** (Jo - 1), axis=1)
+    gott = np.sum(no * Jo * (Jo - 1) * Tr ** (Jo - 2), axis=1)
+    n, Li, Lj = Const.Region2_n, Const.Region2_Li, Const.Region2_Lj
+    pi = Pr ** Li
+    tau = (Tr - 0.5) ** Lj
+    gr = np.sum(n * pi * tau, axis=1)
+    grp = np.sum(n * Li * pi / Pr * tau, axis=1)
+    grt = np.sum(n * Lj * pi * tau / (Tr - 0.5), axis=1)
+    grtt = np.sum(n * Lj * (Lj - 1) * pi * tau / (Tr - 0.5) ** 2, axis=1)
+    if derivatives:
+        grpp = np.sum(n * Li * (Li - 1) * pi / Pr ** 2 * tau, axis=1)
+        grpt = np.sum(n * Li * Lj * pi / Pr * tau / (Tr - 0.5), axis=1)
+    Tr, Pr = Tr[:, 0], Pr[:, 0]
+    props = {
+        'v': Pr * (1 / Pr + grp) * R * T / P / 1000,
+        'h': Tr * (got + grt) * R * T,
+        's': R * (Tr * (got + grt) - (go + gr)),
+        'cp': -R * Tr ** 2 * (gott + grtt),
+    }
+    if derivatives:
+        props.update({
+            'cv': R * (-Tr ** 2 * (gott + grtt) - (1 + Pr * grp - Tr * Pr * grpt) ** 2 / (1 - Pr ** 2 * grpp)),
+            'w': np.sqrt(R * T * 1000 * (1 + 2 * Pr * grp + Pr ** 2 * grp ** 2) / (
+                1 - Pr ** 2 * grpp + (1 + Pr * grp - Tr * Pr * grpt) ** 2 / Tr ** 2 / (gott + grtt))),
+            'alfav': (1 + Pr * grp - Tr * Pr * grpt) / (1 + Pr * grp) / T,
+            'kt': (1 - Pr ** 2 * grpp) / (1 + Pr * grp) / P,
+        })
+    return props
+
+
+def _backward1_t_ph(P, h):
+    n, Li, Lj = Const.Backward1_T_Ph_n, Const.Backward1_T_Ph_Li, Const.Backward1_T_Ph_Lj
+    return np.sum(n * P[:, None] ** Li * (h[:, None] / 2500 + 1) ** Lj, axis=1)
+
+
+def _backward2_t_ph(P, h):
+    P, nu = P[:, None], h[:, None] / 2000
+    T = np.empty(len(P))
+    # Подобласти 2a / 2b / 2c: граница 2b–2c — уравнение B2bc
+    a = P[:, 0] <= 4
+    c = ~a & (P[:, 0] > 6.546699678)
+    c[c] = h[c] < _h_2bc(P[c, 0])
+    b = ~a & ~c
+    for mask, name, shift_p, shift_h in (
+            (a, 'Backward2a_T_Ph', 0, 2.1), (b, 'Backward2b_T_Ph', -2, 2.6),
+            (c, 'Backward2c_T_Ph', 25, 1.8)):
+        if mask.any():
+            n = getattr(Const, name + '_n')
+            Li = getattr(Const, name + '_Li')
+            Lj = getattr(Const, name + '_Lj')
+            T[mask] = np.sum(n * (P[mask] + shift_p) ** Li * (nu[mask] - shift_h) ** Lj, axis=1)
+    return T
+
+
+def _h_2bc(P):
+    return 0.26526571908428e4 + np.sqrt((P - 4.5257578905948) / 1.2809002730136e-4)
+
+
+def _viscosity(rho, T):
+    # IAPWS 2008 без критического усиления, как в IAPWS97
+    Tr = T / Tc
+    Dr = rho / rhoc
+    mu0 = 100 * Tr ** 0.5 / sum(Hi / Tr ** i for i, Hi in enumerate(_VISCOSITY_H))
+    # Двойная сумма по степеням (1/Tr - 1)^i (Dr - 1)^j — через матрицу коэффициентов
+    powers_t = np.cumprod(np.repeat((1 / Tr - 1)[:, None], 6, axis=1), axis=1)
+    powers_d = np.cumprod(np.repeat((Dr - 1)[:, None], 7, axis=1), axis=1)
+    powers_t = np.hstack([np.ones((len(T), 1)), powers_t[:, :-1]])
+    powers_d = np.hstack([np.ones((len(T), 1)), powers_d[:, :-1]])
+    mu1 = np.exp(Dr * np.einsum('ni,ij,nj->n', powers_t, _VISCOSITY_HIJ, powers_d))
+    return mu0 * mu1 * 1e-6
+
+
+def _conductivity(rho, T, cp, cp_cv, mu, drho_dp):
+    # IAPWS 2011, ур. 10, 16–25; (drho/dP)_T опорного состояния — промышленная формулировка
+    Tr = T / Tc
+    d = rho / rhoc
+    k0 = Tr ** 0.5 / sum(n / Tr ** i for i, n in enumerate(_CONDUCTIVITY_N))
+    powers_t = (1 / Tr - 1)[:, None] ** np.arange(5)
+    powers_d = (d - 1)[:, None] ** np.arange(6)
+    k1 = np.exp(d * np.einsum('ni,ij,nj->n', powers_t, _CONDUCTIVITY_NIJ, powers_d))
+    a = _CONDUCTIVITY_A[np.searchsorted(_CONDUCTIVITY_D, d)]
+    drho = 1 / np.sum(a * d[:, None] ** np.arange(6), axis=1) * rhoc / Pc
+    delta = np.maximum(d * (Pc / rhoc * drho_dp - Pc / rhoc * drho * 1.5 / Tr), 0)
+    y = 0.13 * (delta / 0.06) ** (0.63 / 1.239) / 0.4
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Z = 2 / np.pi / y * (((1 - 1 / cp_cv) * np.arctan(y) + y / cp_cv)
+                             - (1 - np.exp(-1 / (1 / y + y ** 2 / 3 / d ** 2))))
+    Z = np.where(y < 1.2e-7, 0, Z)
+    k2 = 177.8514 * d * cp / _RG * Tr / mu * 1e-6 * Z
+    return 1e-3 * (k0 * k1 + k2)
+
+
+def _empty(size, extended=False):
+    names = ('T', 'h', 's', 'v', 'x', 'mu') + (_DERIVATIVES if extended else ())
+    out = {name: np.full(size, np.nan) for name in names}
+    out['region'] = np.zeros(size, dtype=np.int8)
+    return out
+
+
+def _fill(out, mask, region, T, P, transport=True, extended=False):
+    if not mask.any():
+        return
+    T, P = T[mask], P[mask]
+    props = _region1(T, P, extended) if region == 1 else _region2(T, P, extended)
+    out['T'][mask] = T
+    out['h'][mask] = props['h']
+    out['s'][mask] = props['s']
+    out['v'][mask] = props['v']
+    out['x'][mask] = region - 1
+    if transport:
+        out['mu'][mask] = _viscosity(1 / props['v'], T)
+    if extended:
+        for name in _DERIVATIVES:
+            out[name][mask] = props[name]
+    out['region'][mask] = region
+
+
+def _pt_chunk(P, T, transport=True, extended=False):
+    out = _empty(len(P), extended)
+    low = P <= Ps_623
+    tsat = np.where(low, _tsat(np.clip(P, Pmin, Ps_623)), 623.15)
+    t23 = np.where(low, tsat, _t_b23(np.clip(P, Ps_623, PMAX)))
+    valid = (P >= Pmin) & (P <= PMAX) & (T >= TMIN) & (T <= TMAX)
+    _fill(out, valid & (T <= tsat), 1, T, P, transport, extended)
+    _fill(out, valid & (T > tsat) & (T >= t23), 2, T, P, transport, extended)
+    return out
+
+
+def _ph_chunk(P, h, transport=True, extended=False):
+    size = len(P)
+    out = _empty(size, extended)
+    valid = (P >= Pmin) & (P <= PMAX)
+    P_ok = np.where(valid, P, 1.0)
+    low = P_ok <= Ps_623
+    t1 = np.where(low, _tsat(np.clip(P_ok, Pmin, Ps_623)), 623.15)
+    t2 = np.where(low, t1, _t_b23(np.clip(P_ok, Ps_623, PMAX)))
+    h_min = _region1(np.full(size, TMIN), P_ok)['h']
+    water = _region1(t1, P_ok)
+    steam = _region2(t2, P_ok)
+    h_max = _region2(np.full(size, TMAX), P_ok)['h']
+
+    for region, mask in (
+            (1, valid & (h >= h_min) & (h <= water['h'])),
+            (2, valid & (h >= steam['h']) & (h <= h_max))):
+        if not mask.any():
+            continue
+        Pm, hm = P_ok[mask], h[mask]
+        solve = _region1 if region == 1 else _region2
+        T = _backward1_t_ph(Pm, hm) if region == 1 else _backward2_t_ph(Pm, hm)
+        # Уточнение обратного уравнения шагами Ньютона по cp, как newton() в IAPWS97
+        for _ in range(2):
+            props = solve(T, Pm)
+            T = T - (props['h'] - hm) / props['cp']
+        T_full = np.full(size, np.nan)
+        T_full[mask] = T
+        _fill(out, mask, region, T_full, P_ok, transport, extended)
+        out['h'][mask] = hm
+
+    wet = valid & low & (h > water['h']) & (h < steam['h'])
+    if wet.any():
+        x = (h[wet] - water['h'][wet]) / (steam['h'][wet] - water['h'][wet])
+        out['T'][wet] = t1[wet]
+        out['h'][wet] = h[wet]
+        out['s'][wet] = water['s'][wet] + x * (steam['s'][wet] - water['s'][wet])
+        out['v'][wet] = water['v'][wet] + x * (steam['v'][wet] - water['v'][wet])
+        out['x'][wet] = x
+        out['region'][wet] = 4
+    return out
+
+
+def _evaluate(chunk, P, other, transport, extended):
+    P, other = np.broadcast_arrays(
+        np.asarray(P, dtype=float), np.asarray(other, dtype=float))
+    shape = P.shape
+    P, other = P.ravel(), other.ravel()
+    parts = [chunk(P[i:i + CHUNK], other[i:i + CHUNK], transport, extended)
+             for i in range(0, len(P), CHUNK)]
+    if parts:
+        out = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    else:
+        out = _empty(0, extended)
+    T = out['T']
+    out['T'] = T - 273.15
+    out['P'] = P
+    out['rho'] = 1 / out['v']
+    out['nu'] = out['mu'] / out['rho']
+    if extended:
+        _extend(out, T, P)
+    return {name: values.reshape(shape) for name, values in out.items()}
+
+
+def _extend(out, T, P):
+    # Расширенные свойства по cp, cv, w, alfav, kt — те же формулы, что в engine
+    cp, alfav, kt, v = out['cp'], out['alfav'], out.pop('kt'), out['v']
+    out['cp_cv'] = cp / out['cv']
+    out['gamma'] = out['cp_cv'] / P / kt
+    out['xkappa'] = kt
+    out['kappas'] = kt - 1000 * v * alfav ** 2 * T / cp
+    out['joule'] = 1000 * v * (T * alfav - 1) / cp
+    out['deltat'] = 1000 * v * (1 - T * alfav)
+    out['k'] = np.full(len(P), np.nan)
+    known = ~np.isnan(out['mu']) & ~np.isnan(cp)
+    if known.any():
+        out['k'][known] = _conductivity(
+            out['rho'][known], T[known], cp[known], out['cp_cv'][known], out['mu'][known],
+            out['rho'][known] * kt[known],
+        )
+    out['Prandt'] = out['mu'] * cp * 1000 / out['k']
+
+
+def evaluate_pt(P, T, transport=True, extended=False):
+    """Свойства по давлению P [МПа] и температуре T [°C]."""
+    return _evaluate(_pt_chunk, P, np.asarray(T, dtype=float) + 273.15, transport, extended)
+
+
+def evaluate_ph(P, h, transport=True, extended=False):
+    """Свойства по давлению P [МПа] и энтальпии h [кДж/кг]."""
+    return _evaluate(_ph_chunk, P, h, transport, extended)
@@ -1,6 +1,66 @@
+import asyncio
+import csv
+import hashlib
+import itertools
+import json
+import os
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+
+import iapws
+import numpy as np
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponsePermanentRedirect, HttpResponseRedirect, JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
-from .forms import WaterPropertiesForm
-from iapws import IAPWS97
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import (
+    condition, require_GET, require_http_methods, require_POST, require_safe,
+)
+from . import columnar, cycle, history, parallel, pipe, steamtables, sweep, timing, vectorized
+from .cache import MODE_INPUTS, get_single_flight, get_state_cache, normalize
+from .engine import (
+    EXTENDED_PROPERTIES, PHASE_PROPERTIES, STATE_PROPERTIES, SaturationState, compute_state, mode_of,
+)
+from .forms import PipeFlowForm, RankineCycleForm, WaterPropertiesForm
+
+BATCH_MAX_POINTS = 10000
+# Узлов трубы в таблице на странице: остальные — только в JSON
+PIPE_TABLE_ROWS = 50
+GRID_MAX_POINTS = 200000
+# Точки сетки вне областей 1, 2 и 4 считаются скалярно (до ~3 мс каждая в области 3 по P-H)
+GRID_MAX_SCALAR_POINTS = 5000
+SWEEP_MAX_POINTS = 10000
+# Окно строк CSV, считаемых без пула процессов
+CSV_SERIAL_WINDOW = 64
+# Версия страницы результата в ETag: менять при изменении расчёта или шаблона
+RESULT_VERSION = '5'
+# Результат зависит и от версии iapws, быстрого режима и RESULT_VERSION, которых нет в адресе,
+# поэтому не immutable: через сутки кэш сверяет ETag и получает 304 или новую страницу
+RESULT_CACHE_CONTROL = 'public, max-age=86400'
+# Ошибку расчёта кэш хранит, но сверяет при каждом запросе
+RESULT_ERROR_CACHE_CONTROL = 'no-cache'
+# Таблицы меняются только с версией iapws, адрес от неё не зависит
+STEAM_TABLE_CACHE_CONTROL = 'public, max-age=86400'
+PARALLEL_DEFAULTS = {
+    'WORKERS': None,
+    'CHUNK_SIZE': 256,
+    'MIN_POINTS': 2000,
+}
+ASYNC_DEFAULTS = {
+    'WORKERS': None,
+    'MAX_IN_FLIGHT': 8,
+    'RETRY_AFTER': 1,
+}
+# Форматы ответа пакетов, сеток и таблиц по заголовку Accept; по умолчанию — JSON
+RESPONSE_TYPES = ('application/json', 'text/csv', columnar.MEDIA_TYPE)
+# Входные поля точки пакета — столбцы входных данных в CSV и NPZ
+POINT_INPUTS = ('pressure', 'temperature', 'enthalpy')
 
 def home(request):
     return render(request, 'home.html')
@@ -8,75 +68,780 @@ def home(request):
 def about(request):
     return render(request, 'about.html')
 
+def _fast(fast):
+    return settings.CALCULATOR_FAST_MODE if fast is None else bool(fast)
+
+
+# Строковые значения "fast" — как у параметра ?fast= CSV-расчёта
+FAST_VALUES = {'1': True, 'true': True, '0': False, 'false': False}
+FAST_ERROR = 'fast — true или false (в строке: "1", "true", "0", "false").'
+
+
+def _parse_fast(value):
+    # "fast" из запроса: None, логическое JSON или строка из FAST_VALUES; иначе ValueError
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value in FAST_VALUES:
+        return FAST_VALUES[value]
+    raise ValueError(FAST_ERROR)
+
+
+def _validated(form):
+    # Проверка формы (clean и clean_<поле>) — этап validate в Server-Timing
+    with timing.stage('validate'):
+        valid = form.is_valid()
+    if valid and isinstance(form, WaterPropertiesForm):
+        timing.set_mode(mode_of(form.cleaned_data))
+    return valid
+
+
+def _render(request, template_name, context, **kwargs):
+    with timing.stage('render'):
+        return render(request, template_name, context, **kwargs)
+
+
+def _inputs(data):
+    # Режим движка и входные данные по очищенным данным WaterPropertiesForm
+    return mode_of(data), {
+        'pressure': data['pressure'],
+        'temperature': data['temperature'],
+        'enthalpy': data['enthalpy'],
+    }
+
+
+def _calculate(data, fast=None):
+    # (состояние, None) или (None, ошибка) для очищенных данных формы
+    with timing.stage('solve'):
+        return _resolve([_inputs(data)], _fast(fast))[0]
+
+
 def calculate_properties(request):
     form = WaterPropertiesForm(request.POST or None)
+
+    if request.method == 'POST':
+        if _validated(form):
+            # Расчёт — на канонической GET-странице, которую могут кэшировать браузер и прокси
+            url = f"{reverse('calculate_result')}?{_canonical_query(form.cleaned_data)}"
+            response = HttpResponseRedirect(url)
+            response.status_code = 303
+            return response
+
+    return _render(request, 'calculator/calculate.html', {'form': form})
+
+
+def _canonical_query(data):
+    # Строка запроса с полями режима в постоянном порядке и точностью 10 значащих цифр
+    mode, inputs = _inputs(data)
+    fields = [('mode', data['mode'])]
+    if data['mode'] == 'saturation':
+        fields.append(('calc_by', data['calc_by']))
+    else:
+        fields.append(('param_type', data['param_type']))
+    fields += [(name, f'{inputs[name]:.10g}') for name in MODE_INPUTS[mode]]
+    return urlencode(fields)
+
+
+def _result_etag(request):
+    # ETag только для канонического адреса; версия iapws и режим расчёта входят в хеш
+    form = WaterPropertiesForm(request.GET)
+    if not _validated(form):
+        return None
+    query = _canonical_query(form.cleaned_data)
+    if query != request.META.get('QUERY_STRING', ''):
+        return None
+    source = f'{query}|{iapws.__version__}|fast={_fast(None)}|{RESULT_VERSION}'
+    return hashlib.sha256(source.encode()).hexdigest()[:32]
+
+
+# Результат расчёта по GET: входные данные в строке запроса. Неканоническая строка
+# перенаправляется на каноническую, ответ — со строгим ETag и Cache-Control на сутки.
+# Форма на странице отправляется GET-запросом сюда же, без CSRF-токена и cookie.
+@require_safe
+@condition(etag_func=_result_etag)
+def calculation_result(request):
+    form = WaterPropertiesForm(request.GET)
+    context = {'form': form, 'form_method': 'get', 'form_action': reverse('calculate_result')}
+    if not _validated(form):
+        return _render(request, 'calculator/calculate.html', context, status=400)
+    query = _canonical_query(form.cleaned_data)
+    if query != request.META.get('QUERY_STRING', ''):
+        return HttpResponsePermanentRedirect(f'{request.path}?{query}')
+
+    context['result'], context['error'] = _calculate(form.cleaned_data)
+    response = _render(request, 'calculator/calculate.html', context)
+    response['Cache-Control'] = RESULT_CACHE_CONTROL if context['error'] is None else RESULT_ERROR_CACHE_CONTROL
+    return response
+
+
+def _async_options():
+    return {**ASYNC_DEFAULTS, **getattr(settings, 'CALCULATOR_ASYNC', {})}
+
+
+_in_flight = None
+_in_flight_lock = threading.Lock()
+
+
+def _in_flight_slots():
+    # Счётчик одновременных расчётов на процесс, ёмкость — MAX_IN_FLIGHT
+    global _in_flight
+    if _in_flight is None:
+        with _in_flight_lock:
+            if _in_flight is None:
+                _in_flight = threading.BoundedSemaphore(_async_options()['MAX_IN_FLIGHT'])
+    return _in_flight
+
+
+async def _calculate_async(data):
+    # Попадание в кэш отдаётся сразу, промах считается в отдельном пуле процессов,
+    # чтобы расчёт не держал GIL и цикл событий. None — все слоты заняты.
+    mode, inputs = _inputs(data)
+    fast = _fast(None)
+    cache = get_state_cache()
+    state = cache.get(mode, fast, **inputs)
+    if state is not None:
+        return state, None
+    if history.enabled():
+        state = await history.alookup(history.key_of(mode, inputs, fast))
+        if state is not None:
+            cache.put(state, mode, fast, **inputs)
+            return state, None
+    key, normalized, fast_mode = normalize(mode, fast, **inputs)
+
+    async def compute():
+        slots = _in_flight_slots()
+        if not slots.acquire(blocking=False):
+            return None
+        try:
+            pool = parallel.get_pool(_async_options()['WORKERS'], fast_mode, name='async')
+            state, error = await asyncio.get_running_loop().run_in_executor(
+                pool, parallel.compute_one, mode, normalized, fast_mode)
+        finally:
+            slots.release()
+        if state is not None:
+            cache.put(state, mode, fast, **inputs)
+            if history.enabled():
+                await history.arecord(mode, inputs, fast, state)
+        return state, error
+
+    # Одинаковые одновременные запросы ждут один расчёт и не занимают слоты
+    return (await get_single_flight().ado(key, compute))[0]
+
+
+# Асинхронный вариант формы расчёта для запуска под ASGI (uvicorn wasp.asgi:application).
+# Одновременно считается не более MAX_IN_FLIGHT точек, сверх этого — 503 с Retry-After.
+async def calculate_properties_async(request):
+    form = WaterPropertiesForm(request.POST or None)
     result = None
     error = None
 
-    if request.method == 'POST':
-        if form.is_valid():
-            mode = form.cleaned_data['mode']
-            pressure = form.cleaned_data['pressure']
-            temperature = form.cleaned_data['temperature']
-            enthalpy = form.cleaned_data['enthalpy']
-            calc_by = form.cleaned_data['calc_by']
-            param_type = form.cleaned_data['param_type']
-
-            try:
-                if mode == 'saturation':
-                    if calc_by == 'P':
-                        if not (0.000611 < pressure < 22.064):
-                            raise ValueError("Давление должно быть в диапазоне 0.000611–22.064 МПа")
-                        water = IAPWS97(P=pressure, x=0)
-                        steam = IAPWS97(P=pressure, x=1)
-                        result = {
-                            'P': pressure,  # Введённое давление
-                            'T': water.T - 273.15,  # Температура из IAPWS97
-                            'water': {
-                                'h': water.h, 's': water.s, 'v': water.v,
-                                'rho': water.rho, 'mu': water.mu, 'nu': water.mu / water.rho
-                            },
-                            'steam': {
-                                'h': steam.h, 's': steam.s, 'v': steam.v,
-                                'rho': steam.rho, 'mu': steam.mu, 'nu': steam.mu / steam.rho
-                            }
-                        }
-                    else:  # calc_by == 'T'
-                        if not (0 < temperature < 373.946):
-                            raise ValueError("Температура должна быть в диапазоне 0–373.946 °C")
-                        water = IAPWS97(T=temperature + 273.15, x=0)
-                        steam = IAPWS97(T=temperature + 273.15, x=1)
-                        result = {
-                            'P': water.P,  # Давление из IAPWS97
-                            'T': temperature,  # Введённая температура
-                            'water': {
-                                'h': water.h, 's': water.s, 'v': water.v,
-                                'rho': water.rho, 'mu': water.mu, 'nu': water.mu / water.rho
-                            },
-                            'steam': {
-                                'h': steam.h, 's': steam.s, 'v': steam.v,
-                                'rho': steam.rho, 'mu': steam.mu, 'nu': steam.mu / steam.rho
-                            }
-                        }
-                elif mode == 'full':
-                    if param_type == 'P-H':
-                        if not (0.000611 < pressure < 100):
-                            raise ValueError("Давление должно быть в диапазоне 0.000611–100 МПа")
-                        water = IAPWS97(P=pressure, h=enthalpy)
-                    elif param_type == 'P-T-water':
-                        if not (0.000611 < pressure < 100):
-                            raise ValueError("Давление должно быть в диапазоне 0.000611–100 МПа")
-                        water = IAPWS97(P=pressure, T=temperature + 273.15, x=0)
-                    elif param_type == 'P-T-steam':
-                        if not (0.000611 < pressure < 100):
-                            raise ValueError("Давление должно быть в диапазоне 0.000611–100 МПа")
-                        water = IAPWS97(P=pressure, T=temperature + 273.15, x=1)
-                    result = {
-                        'P': water.P, 'T': water.T - 273.15, 'h': water.h, 's': water.s,
-                        'v': water.v, 'rho': water.rho, 'x': water.x if water.x is not None else 'N/A',
-                        'mu': water.mu, 'nu': water.mu / water.rho
-                    }
-            except Exception as e:
-                error = f"Ошибка в расчётах: {str(e)}"
-
-    return render(request, 'calculator/calculate.html', {'form': form, 'result': result, 'error': error})
\ No newline at end of file
+    if request.method == 'POST' and _validated(form):
+        with timing.stage('solve'):
+            computed = await _calculate_async(form.cleaned_data)
+        if computed is None:
+            response = HttpResponse('Сервер занят расчётами, повторите запрос позже.',
+                                    status=503, content_type='text/plain; charset=utf-8')
+            response['Retry-After'] = str(_async_options()['RETRY_AFTER'])
+            return response
+        result, error = computed
+
+    return _render(request, 'calculator/calculate.html', {'form': form, 'result': result, 'error': error})
+
+
+# Пакетный расчёт: принимает JSON-массив точек (те же поля, что у WaterPropertiesForm)
+# и возвращает результаты в том же порядке. Ошибка в одной точке не прерывает пакет.
+# В объекте запроса можно передать "fast": true/false ("1"/"true"/"0"/"false", как у CSV)
+# вместо CALCULATOR_FAST_MODE
+# и "properties": [...] — только эти свойства в ответе (вязкость тогда не считается).
+# С Accept: text/csv или application/x-npz ответ — таблица CSV или столбцы NPZ.
+@csrf_exempt
+@require_POST
+def calculate_batch(request):
+    try:
+        points = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный JSON.'}, status=400)
+    fast = None
+    properties = None
+    if isinstance(points, dict):
+        fast = points.get('fast')
+        properties = points.get('properties')
+        points = points.get('points')
+    if not isinstance(points, list):
+        return JsonResponse({'error': 'Ожидается массив точек или объект с ключом "points".'}, status=400)
+    try:
+        fast = _parse_fast(fast)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if len(points) > BATCH_MAX_POINTS:
+        return JsonResponse({'error': f'Не более {BATCH_MAX_POINTS} точек за запрос.'}, status=400)
+    if properties is not None and not _valid_properties(properties):
+        return JsonResponse({'error': 'properties — массив имён свойств: '
+                                      + ', '.join(STATE_PROPERTIES) + '.'}, status=400)
+
+    with timing.stage('solve'):
+        computed = _calculate_points(points, fast)
+    response_type = _response_type(request)
+    if response_type != 'application/json':
+        inputs = {name: [_point_input(point, name) for point in points] for name in POINT_INPUTS}
+        return _table_response(response_type, 'wasp_batch', computed, properties, inputs)
+    results = []
+    for state, error in computed:
+        results.append({'result': state.as_dict(properties)} if error is None else {'error': error})
+
+    return _negotiated(JsonResponse({'results': results}))
+
+
+def _response_type(request):
+    return request.get_preferred_type(RESPONSE_TYPES) or 'application/json'
+
+
+def _negotiated(response):
+    # Ответ зависит от Accept — кэши должны это учитывать
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def _point_input(point, name):
+    # Входное значение точки пакета как число; нет или не число — NaN
+    try:
+        return float(point[name])
+    except (KeyError, TypeError, ValueError):
+        return np.nan
+
+
+def _table_response(response_type, filename, results, properties, inputs):
+    # Результаты точек [(состояние, ошибка)] с входными столбцами inputs — в CSV или NPZ
+    if response_type == columnar.MEDIA_TYPE:
+        inputs = {name: np.asarray(values, dtype=float) for name, values in inputs.items()}
+        return _npz_response(columnar.from_results(results, properties, inputs), filename)
+    columns = _csv_columns(properties)
+    writer = csv.writer(_Echo())
+    lines = [writer.writerow(list(inputs) + columns)]
+    for values, (state, error) in zip(zip(*inputs.values()), results):
+        row = _csv_row(state, error, properties)
+        lines.append(writer.writerow(['' if value != value else value for value in values]
+                                     + [row[name] for name in columns]))
+    return _csv_response(lines, filename)
+
+
+def _npz_response(columns, filename):
+    response = HttpResponse(columnar.dumps(columns), content_type=columnar.MEDIA_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.npz"'
+    return _negotiated(response)
+
+
+def _csv_response(lines, filename):
+    response = HttpResponse(''.join(lines), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return _negotiated(response)
+
+
+def _valid_properties(properties):
+    return isinstance(properties, list) and all(name in STATE_PROPERTIES for name in properties)
+
+
+def _validate_point(point):
+    # Точка пакета: ((mode, inputs), None) или (None, ошибка проверки)
+    if not isinstance(point, dict):
+        return None, 'Точка должна быть объектом.'
+    form = WaterPropertiesForm(point)
+    if not form.is_valid():
+        return None, form.errors.get_json_data()
+    return _inputs(form.cleaned_data), None
+
+
+def _parallel_options():
+    return {**PARALLEL_DEFAULTS, **getattr(settings, 'CALCULATOR_PARALLEL', {})}
+
+
+def _calculate_points(points, fast=None, use_pool=None):
+    # Пакет точек: [(состояние, None) или (None, ошибка)] в порядке входа.
+    # Большие пакеты (от MIN_POINTS) считаются в пуле процессов мимо кэша.
+    fast = _fast(fast)
+    validated = [_validate_point(point) for point in points]
+    todo = [item for item, error in validated if error is None]
+    options = _parallel_options()
+    if use_pool is None:
+        use_pool = len(todo) >= options['MIN_POINTS']
+    computed = iter(_resolve(todo, fast, use_pool and options['WORKERS'] != 1))
+    return [next(computed) if error is None else (None, error) for item, error in validated]
+
+
+def _resolve(todo, fast, pooled=False):
+    # Точки (mode, inputs): кэш процесса, затем история в БД (один запрос на порцию
+    # ключей), остальное считается и сохраняется одним bulk_create.
+    # В пуле процессов кэш процесса не используется — большие пакеты его бы вытеснили.
+    cache = get_state_cache()
+    results = [None] * len(todo)
+    missing = []
+    for i, (mode, inputs) in enumerate(todo):
+        state = None if pooled else cache.get(mode, fast, **inputs)
+        if state is None:
+            missing.append(i)
+        else:
+            results[i] = (state, None)
+
+    if missing and history.enabled():
+        keys = {i: history.key_of(*todo[i], fast) for i in missing}
+        found = history.lookup_many(keys.values())
+        for i in missing:
+            state = found.get(keys[i])
+            if state is not None:
+                results[i] = (state, None)
+                if not pooled:
+                    mode, inputs = todo[i]
+                    cache.put(state, mode, fast, **inputs)
+        missing = [i for i in missing if results[i] is None]
+
+    if missing:
+        if pooled:
+            options = _parallel_options()
+            points = [(todo[i][0], normalize(todo[i][0], fast, **todo[i][1])[1]) for i in missing]
+            computed = parallel.compute_many(points, fast, options['WORKERS'], options['CHUNK_SIZE'])
+            computed = [(result, False) for result in computed]
+        else:
+            computed = [_compute_shared(*todo[i], fast) for i in missing]
+        records = []
+        for i, ((state, error), shared) in zip(missing, computed):
+            results[i] = (state, error)
+            # Результат чужого расчёта уже сохранил его ведущий запрос
+            if state is not None and not shared:
+                records.append((*todo[i], fast, state))
+        if records and history.enabled():
+            history.record_many(records)
+    return results
+
+
+def _compute_shared(mode, inputs, fast):
+    # Один расчёт на нормализованный ключ: одновременные одинаковые запросы ждут его.
+    # Состояние кладётся в кэш до снятия ключа, следующие запросы возьмут его оттуда.
+    # Результат — ((состояние, ошибка), взят ли он у чужого расчёта).
+    key, normalized, _ = normalize(mode, fast, **inputs)
+
+    def compute():
+        state, error = parallel.compute_one(mode, normalized, fast)
+        if state is not None:
+            get_state_cache().put(state, mode, fast, **inputs)
+        return state, error
+
+    return get_single_flight().do(key, compute)
+
+
+class _Echo:
+    # Псевдобуфер для csv.writer: writerow() сразу возвращает строку
+    def write(self, value):
+        return value
+
+
+CSV_COLUMNS = (
+    STATE_PROPERTIES
+    + tuple(f'{name}_water' for name in PHASE_PROPERTIES)
+    + tuple(f'{name}_steam' for name in PHASE_PROPERTIES)
+    + ('region', 'path', 'error')
+)
+
+
+def _csv_lines(stream):
+    # Построчное чтение загруженного файла или тела запроса без чтения целиком
+    for line in stream:
+        yield line.decode('utf-8-sig')
+
+
+def _csv_columns(properties=None):
+    # Столбцы CSV_COLUMNS только для свойств из properties
+    if properties is None:
+        return list(CSV_COLUMNS)
+    phase = [name for name in PHASE_PROPERTIES if name in properties]
+    return (
+        [name for name in STATE_PROPERTIES if name in properties]
+        + [f'{name}_water' for name in phase] + [f'{name}_steam' for name in phase]
+        + ['region', 'path', 'error']
+    )
+
+
+def _csv_row(state, error, properties=None):
+    # Не выбранные свойства не читаются — и не считаются
+    row = dict.fromkeys(CSV_COLUMNS, '')
+    if error is not None:
+        row['error'] = error if isinstance(error, str) else json.dumps(error, ensure_ascii=False)
+    elif isinstance(state, SaturationState):
+        row['P'], row['T'] = state.P, state.T
+        for name in PHASE_PROPERTIES:
+            if properties is None or name in properties:
+                row[f'{name}_water'] = getattr(state.water, name)
+                row[f'{name}_steam'] = getattr(state.steam, name)
+    else:
+        for name in STATE_PROPERTIES:
+            if properties is None or name in properties:
+                row[name] = getattr(state, name)
+    if state is not None:
+        row['region'], row['path'] = state.region, state.path
+    return row
+
+
+def _stream_csv(lines, fast):
+    header = next(lines, '')
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    names = [name.strip() for name in next(csv.reader([header], delimiter=delimiter), [])]
+    writer = csv.writer(_Echo(), delimiter=delimiter)
+    yield writer.writerow(names + list(CSV_COLUMNS))
+
+    # Строки считаются окнами. Пока пул процессов запускается и прогревается
+    # (секунды на первом запросе), строки считаются здесь же небольшими окнами
+    # и первые уходят сразу; с готовым пулом — окнами по порции на воркер
+    options = _parallel_options()
+    fast = _fast(fast)
+    pool_window = options['CHUNK_SIZE'] * (options['WORKERS'] or os.cpu_count() or 1)
+    ready = None
+    rows = (values for values in csv.reader(lines, delimiter=delimiter) if any(v.strip() for v in values))
+    while True:
+        use_pool = ready is not None and ready.done()
+        batch = list(itertools.islice(rows, pool_window if use_pool else CSV_SERIAL_WINDOW))
+        if not batch:
+            break
+        if ready is None and len(batch) == CSV_SERIAL_WINDOW and options['WORKERS'] != 1:
+            # Строк больше одного окна — пул запускается, пока считается это окно
+            ready = parallel.start_pool(options['WORKERS'], fast)
+        points = []
+        for values in batch:
+            point = {name: value.strip() for name, value in zip(names, values)}
+            if delimiter == ';':
+                # Файлы с «;» обычно из русской локали Excel — с десятичной запятой
+                point = {name: value.replace(',', '.') for name, value in point.items()}
+            points.append(point)
+        for values, result in zip(batch, _calculate_points(points, fast, use_pool)):
+            row = _csv_row(*result)
+            yield writer.writerow(values + [row[name] for name in CSV_COLUMNS])
+
+
+# Пакетный расчёт из CSV: строки читаются и считаются по одной, результат отдаётся
+# потоком, поэтому память не зависит от размера файла. Столбцы входного файла —
+# поля WaterPropertiesForm (mode, calc_by, param_type, pressure, temperature, enthalpy);
+# разделитель «,» или «;» определяется по заголовку. Файл — поле file формы или
+# тело запроса с Content-Type text/csv.
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def calculate_csv(request):
+    if request.method == 'GET':
+        return _render(request, 'calculator/csv.html', {'columns': CSV_COLUMNS})
+    if request.content_type == 'text/csv':
+        stream = request
+    elif 'file' in request.FILES:
+        stream = request.FILES['file']
+    else:
+        return _render(request, 'calculator/csv.html', {
+            'columns': CSV_COLUMNS, 'error': 'Выберите CSV-файл.',
+        }, status=400)
+    try:
+        fast = _parse_fast(request.GET.get('fast'))
+    except ValueError as e:
+        return _render(request, 'calculator/csv.html', {'columns': CSV_COLUMNS, 'error': str(e)}, status=400)
+
+    response = StreamingHttpResponse(_stream_csv(_csv_lines(stream), fast), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="wasp_results.csv"'
+    return response
+
+
+def _axis(spec):
+    # Ось сетки: список значений или {"start", "stop", "num"}
+    if isinstance(spec, dict):
+        return np.linspace(float(spec['start']), float(spec['stop']), _axis_size(spec))
+    return np.asarray(spec, dtype=float).ravel()
+
+
+def _axis_size(spec):
+    # Число точек оси без построения самой оси
+    if isinstance(spec, dict):
+        num = int(spec['num'])
+        if num < 1:
+            raise ValueError(num)
+        return num
+    return np.size(spec)
+
+
+def _grid(param_type, pressure, other, other_name, transport, extended):
+    # Столбцы сетки и сами сетки P, X: векторно, точки вне областей 1, 2 и 4 — скалярно
+    P, X = np.meshgrid(pressure, other, indexing='ij')
+    if param_type == 'P-T':
+        columns = vectorized.evaluate_pt(P, X, transport, extended)
+    else:
+        columns = vectorized.evaluate_ph(P, X, transport, extended)
+    mode = 'P-T-water' if param_type == 'P-T' else 'P-H'
+    outside = np.nonzero(columns['region'] == 0)
+    if outside[0].size > GRID_MAX_SCALAR_POINTS:
+        raise ValueError(f'Не более {GRID_MAX_SCALAR_POINTS} точек сетки вне областей 1, 2 и 4 '
+                         f'(в сетке {outside[0].size}): сузьте диапазон или уменьшите число точек.')
+    for index in zip(*outside):
+        try:
+            state = compute_state(mode, pressure=P[index], **{other_name: X[index]})
+        except Exception:
+            continue
+        columns['region'][index] = int(state.region[0])
+        names = ('T', 'h', 's', 'v', 'rho', 'x') + (('mu', 'nu') if transport else ())
+        for name in names + (EXTENDED_PROPERTIES if extended else ()):
+            value = getattr(state, name)
+            columns[name][index] = value if value is not None else np.nan
+    return columns, P, X
+
+
+def _grid_column(values):
+    return [None if value != value else value for value in values.ravel().tolist()]
+
+
+# Расчёт на сетке P × T или P × H векторным вычислителем (calculator.vectorized).
+# Точки вне областей 1, 2 и 4 досчитываются скалярно, ошибки дают null.
+# "properties": [...] ограничивает столбцы ответа; без mu и nu вязкость не считается,
+# без расширенных свойств (cp, cv, w, k, ...) — производные уравнений областей.
+# С Accept: application/x-npz — столбцы формы сетки и оси в NPZ, с text/csv — строка на точку.
+@csrf_exempt
+@require_POST
+def calculate_grid(request):
+    try:
+        payload = json.loads(request.body)
+        param_type = payload['param_type']
+        other_name = {'P-T': 'temperature', 'P-H': 'enthalpy'}[param_type]
+        # Размер сетки проверяется до построения осей: num может быть любым числом
+        if _axis_size(payload['pressure']) * _axis_size(payload[other_name]) > GRID_MAX_POINTS:
+            return JsonResponse({'error': f'Не более {GRID_MAX_POINTS} точек сетки за запрос.'}, status=400)
+        pressure = _axis(payload['pressure'])
+        other = _axis(payload[other_name])
+    except (ValueError, KeyError, TypeError, OverflowError):
+        return JsonResponse({'error': 'Ожидается объект с param_type ("P-T" или "P-H"), '
+                                      'pressure и temperature/enthalpy.'}, status=400)
+    properties = payload.get('properties')
+    if properties is not None and not _valid_properties(properties):
+        return JsonResponse({'error': 'properties — массив имён свойств: '
+                                      + ', '.join(STATE_PROPERTIES) + '.'}, status=400)
+    extended = properties is None or any(name in EXTENDED_PROPERTIES for name in properties)
+    # Теплопроводности и числу Прандтля нужна вязкость
+    transport = properties is None or any(name in ('mu', 'nu', 'k', 'Prandt') for name in properties)
+
+    try:
+        with timing.stage('solve'):
+            columns, P, X = _grid(param_type, pressure, other, other_name, transport, extended)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if properties is not None:
+        columns = {name: values for name, values in columns.items()
+                   if name in properties or name not in STATE_PROPERTIES}
+
+    response_type = _response_type(request)
+    if response_type == columnar.MEDIA_TYPE:
+        return _npz_response(columnar.from_grid(columns, {'pressure': pressure, other_name: other}), 'wasp_grid')
+    if response_type == 'text/csv':
+        writer = csv.writer(_Echo())
+        lines = [writer.writerow(['pressure', other_name] + list(columns))]
+        values = [P.ravel().tolist(), X.ravel().tolist()] + [_grid_column(column) for column in columns.values()]
+        lines.extend(writer.writerow(['' if value is None else value for value in row]) for row in zip(*values))
+        return _csv_response(lines, 'wasp_grid')
+    return _negotiated(JsonResponse({
+        'param_type': param_type,
+        'shape': [pressure.size, other.size],
+        'columns': {name: _grid_column(values) for name, values in columns.items()},
+    }))
+
+
+# Таблица по изобаре или изотерме (calculator.sweep): {"sweep": "isobar-T" | "isobar-H" |
+# "isotherm", "pressure" или "temperature" — постоянный параметр, "start", "stop", "step"}.
+# Как и в пакетном расчёте, можно передать "fast" и "properties", а ответ получить в CSV или NPZ.
+@csrf_exempt
+@require_POST
+def calculate_sweep(request):
+    try:
+        payload = json.loads(request.body)
+        kind = payload['sweep']
+        fixed_name = sweep.SWEEPS[kind][1]
+        fixed = float(payload[fixed_name])
+        start, stop, step = (float(payload[name]) for name in ('start', 'stop', 'step'))
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Ожидается объект с sweep ("isobar-T", "isobar-H" или '
+                                      '"isotherm"), pressure или temperature, start, stop и step.'}, status=400)
+    try:
+        # Число точек — арифметикой: список значений строится только после проверки лимита
+        count = sweep.count(start, stop, step)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if count > SWEEP_MAX_POINTS:
+        return JsonResponse({'error': f'Не более {SWEEP_MAX_POINTS} точек за запрос.'}, status=400)
+    properties = payload.get('properties')
+    if properties is not None and not _valid_properties(properties):
+        return JsonResponse({'error': 'properties — массив имён свойств: '
+                                      + ', '.join(STATE_PROPERTIES) + '.'}, status=400)
+    try:
+        fast = _parse_fast(payload.get('fast'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    with timing.stage('solve'):
+        computed = sweep.compute_sweep(kind, fixed, start, stop, step, _fast(fast))
+    response_type = _response_type(request)
+    if response_type != 'application/json':
+        variable = sweep.SWEEPS[kind][2]
+        inputs = {fixed_name: [fixed] * count, variable: sweep.values(start, stop, step)}
+        return _table_response(response_type, 'wasp_sweep', computed, properties, inputs)
+    results = []
+    for state, error in computed:
+        results.append({'result': state.as_dict(properties)} if error is None else {'error': error})
+
+    return _negotiated(JsonResponse({'sweep': kind, fixed_name: fixed, 'results': results}))
+
+
+@require_GET
+def calculator_stats(request):
+    stats = {'cache': get_state_cache().stats(), 'coalescing': get_single_flight().stats()}
+    if history.enabled():
+        stats['history'] = history.stats()
+    return JsonResponse(stats)
+
+
+def _solve_cycle(data):
+    # (цикл, None) или (None, ошибка) для очищенных данных RankineCycleForm
+    try:
+        with timing.stage('solve'):
+            return cycle.solve(**data), None
+    except Exception as e:
+        return None, f"Ошибка в расчётах: {str(e)}"
+
+
+# Цикл Ренкина: все точки цикла, КПД и тепловой расход за один запрос.
+# Форма отправляется GET-запросом — страницу с результатом можно сохранить в закладки.
+@require_safe
+def calculate_cycle(request):
+    form = RankineCycleForm(request.GET or None)
+    result = error = None
+    if _validated(form):
+        result, error = _solve_cycle(form.cleaned_data)
+    return _render(request, 'calculator/cycle.html', {'form': form, 'result': result, 'error': error})
+
+
+# Цикл Ренкина в JSON: объект с полями RankineCycleForm; "properties": [...] —
+# только эти свойства в состояниях точек.
+@csrf_exempt
+@require_POST
+def calculate_cycle_api(request):
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный JSON.'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Ожидается объект с параметрами цикла.'}, status=400)
+    properties = payload.get('properties')
+    if properties is not None and not _valid_properties(properties):
+        return JsonResponse({'error': 'properties — массив имён свойств: '
+                                      + ', '.join(STATE_PROPERTIES) + '.'}, status=400)
+    form = RankineCycleForm(payload)
+    if not _validated(form):
+        return JsonResponse({'error': form.errors.get_json_data()}, status=400)
+    result, error = _solve_cycle(form.cleaned_data)
+    if error is not None:
+        return JsonResponse({'error': error}, status=400)
+    return JsonResponse({'result': result.as_dict(properties)})
+
+
+def _solve_pipe(data):
+    # (поток в трубе, None) или (None, ошибка) для очищенных данных PipeFlowForm
+    try:
+        with timing.stage('solve'):
+            return pipe.solve(**data), None
+    except Exception as e:
+        return None, f"Ошибка в расчётах: {str(e)}"
+
+
+# Течение в трубе: давление и состояние потока по длине, форма GET-запросом.
+# В таблице — не больше PIPE_TABLE_ROWS узлов через равный шаг и выход.
+@require_safe
+def calculate_pipe(request):
+    form = PipeFlowForm(request.GET or None)
+    result = error = rows = None
+    if _validated(form):
+        result, error = _solve_pipe(form.cleaned_data)
+    if result is not None:
+        step = -(-(len(result.nodes) - 1) // PIPE_TABLE_ROWS)
+        rows = result.nodes[:-1:step] + result.nodes[-1:]
+    return _render(request, 'calculator/pipe.html', {'form': form, 'result': result, 'rows': rows, 'error': error})
+
+
+# Течение в трубе в JSON: объект с полями PipeFlowForm; "properties": [...] —
+# только эти свойства в состояниях узлов.
+@csrf_exempt
+@require_POST
+def calculate_pipe_api(request):
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный JSON.'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Ожидается объект с параметрами трубы.'}, status=400)
+    properties = payload.get('properties')
+    if properties is not None and not _valid_properties(properties):
+        return JsonResponse({'error': 'properties — массив имён свойств: '
+                                      + ', '.join(STATE_PROPERTIES) + '.'}, status=400)
+    form = PipeFlowForm(payload)
+    if not _validated(form):
+        return JsonResponse({'error': form.errors.get_json_data()}, status=400)
+    result, error = _solve_pipe(form.cleaned_data)
+    if error is not None:
+        return JsonResponse({'error': error}, status=400)
+    return JsonResponse({'result': result.as_dict(properties)})
+
+
+def _gzip_accepted(request):
+    # Accept-Encoding с весами (RFC 9110): gzip;q=0 — отказ; без gzip решает '*'
+    weights = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding.lower()] = weight
+    return weights.get('gzip', weights.get('x-gzip', weights.get('*', 0))) > 0
+
+
+def _steam_table_etag(request, name, fmt='html'):
+    # У сжатого и несжатого ответа разные байты — и разные ETag
+    if name not in steamtables.TABLES:
+        return None
+    etag = steamtables.get(name, fmt).etag
+    return etag + '-gzip' if _gzip_accepted(request) else etag
+
+
+def _steam_table_headers(view):
+    # Vary и Cache-Control и на ответ 304 от condition: по нему кэш продлевает свою копию
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            patch_vary_headers(response, ('Accept-Encoding',))
+            response['Cache-Control'] = STEAM_TABLE_CACHE_CONTROL
+        return response
+    return wrapper
+
+
+# Таблицы воды и пара (calculator.steamtables): готовые байты HTML или CSV, сжатые
+# заранее, — без расчёта и шаблонизатора. gzip отдаётся, если клиент его принимает.
+@require_safe
+@_steam_table_headers
+@condition(etag_func=_steam_table_etag)
+def steam_table(request, name, fmt='html'):
+    if name not in steamtables.TABLES:
+        raise Http404('Нет такой таблицы.')
+    page = steamtables.get(name, fmt)
+    compressed = _gzip_accepted(request)
+    response = HttpResponse(page.compressed if compressed else page.content, content_type=page.content_type)
+    if compressed:
+        response['Content-Encoding'] = 'gzip'
+    if fmt == 'csv':
+        response['Content-Disposition'] = f'attachment; filename="wasp_{name}.csv"'
+    return response
+
+
+# Гистограммы длительности этапов по режимам (calculator.timing) в формате Prometheus
+@require_GET
+def calculator_metrics(request):
+    return HttpResponse(timing.metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
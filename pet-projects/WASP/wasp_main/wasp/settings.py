@@ -21,6 +21,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'calculator.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,3 +86,67 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Быстрый режим калькулятора: свойства всей области по сплайновым таблицам
+# (calculator.sbtl) вместо прямого расчёта IAPWS97
+CALCULATOR_FAST_MODE = False
+
+# Кэш рассчитанных состояний (calculator.cache): 'local' — LRU в процессе,
+# 'django' — кэш Django CACHES[ALIAS], общий для воркеров. TTL None — без устаревания.
+CALCULATOR_CACHE = {
+    'BACKEND': 'local',
+    'ALIAS': 'default',
+    'MAXSIZE': 1024,
+    'TTL': None,
+}
+
+# Пул процессов для больших пакетов (calculator.parallel): WORKERS None — по числу
+# ядер, 1 — без пула; пакеты от MIN_POINTS точек делятся на порции по CHUNK_SIZE
+CALCULATOR_PARALLEL = {
+    'WORKERS': None,
+    'CHUNK_SIZE': 256,
+    'MIN_POINTS': 2000,
+}
+
+# Асинхронная форма расчёта (calculator/async/ под ASGI): промахи кэша считаются
+# в отдельном пуле из WORKERS процессов, не более MAX_IN_FLIGHT расчётов
+# одновременно, остальным — 503 с заголовком Retry-After в секундах
+CALCULATOR_ASYNC = {
+    'WORKERS': None,
+    'MAX_IN_FLIGHT': 8,
+    'RETRY_AFTER': 1,
+}
+
+# История расчётов в БД (calculator.models.CalculationRecord): повторные расчёты
+# берутся из неё поиском по уникальному ключу, новые пакеты пишутся bulk_create
+CALCULATOR_HISTORY = True
+
+# Прогрев калькулятора при запуске (CalculatorConfig.ready): импорт iapws, таблицы
+# и расчёт в каждом режиме. Включать с gunicorn --preload, чтобы воркеры получили
+# прогретое состояние от мастера
+CALCULATOR_WARMUP = False
+
+# Файл таблиц калькулятора (manage.py build_calculator_tables): воркеры отображают
+# его только для чтения вместо построения таблиц. None — таблицы строятся в каждом
+# процессе; устаревший файл (другая версия iapws, битая контрольная сумма) не используется
+CALCULATOR_TABLES_FILE = None
+
+# Каталог готовых страниц таблиц воды и пара (manage.py build_steam_tables): страницы
+# каждой версии iapws лежат в своём подкаталоге, недостающие строятся при первом запросе.
+# None — страницы строятся в памяти каждого процесса при первом запросе
+CALCULATOR_STEAM_TABLES_DIR = None
+
+# Заголовок Server-Timing с длительностью этапов запроса (calculator.timing). Гистограммы
+# этапов по режимам копятся и без него, их отдаёт /calculator/metrics/
+CALCULATOR_SERVER_TIMING = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'calculator': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}